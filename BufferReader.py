@@ -1,10 +1,97 @@
+import functools
+import mmap
 import struct
+import sys
+from array import array
+
+_INT32 = struct.Struct("<i")
+_INT64 = struct.Struct("<q")
+_FLOAT = struct.Struct("<f")
+
+
+def _decode_string(raw: bytes) -> str:
+    return str(raw, "utf-8").strip("\x00")
+
+
+class StringCache:
+    """Bounded LRU cache of decoded strings, keyed on their raw bytes.
+
+    Type paths, property names and level names repeat thousands of times per body. With a cache, each of them is
+    decoded once and the same str instance is shared by all objects.
+    """
+
+    def __init__(self, max_size: int = 8192):
+        self.decode = functools.lru_cache(maxsize=max_size)(_decode_string)
+
+    @property
+    def hits(self) -> int:
+        return self.decode.cache_info().hits
+
+    @property
+    def misses(self) -> int:
+        return self.decode.cache_info().misses
+
+    @property
+    def size(self) -> int:
+        return self.decode.cache_info().currsize
+
+    @property
+    def hit_rate(self) -> float:
+        info = self.decode.cache_info()
+        total = info.hits + info.misses
+        return info.hits / total if total else 0.0
+
+    def clear(self):
+        self.decode.cache_clear()
+
+    def __repr__(self):
+        return f"StringCache(hits={self.hits}, misses={self.misses}, size={self.size}, hit_rate={self.hit_rate:.1%})"
 
 
 class BufferReader:
-    def __init__(self, buffer):
-        self.buffer = buffer
+    def __init__(self, buffer, zero_copy: bool = False, tracer=None, string_cache: StringCache = None,
+                 struct_cache=None):
+        """
+        :param buffer: Any object supporting the buffer protocol (bytes, bytearray, mmap, memoryview).
+        :param zero_copy: Wrap the buffer in a memoryview, so next_bytes returns views instead of copies.
+        :param tracer: Optional tracing.Tracer receiving parse events.
+        :param string_cache: Optional cache used to intern the decoded strings.
+        :param struct_cache: Optional reader.BpStructCache used to share identical struct properties.
+        """
+        self._mmap = None
+        self.buffer = memoryview(buffer) if zero_copy else buffer
         self.offset = 0
+        self.tracer = tracer
+        self.string_cache = string_cache
+        self.struct_cache = struct_cache
+
+    @classmethod
+    def from_file(cls, path) -> "BufferReader":
+        """Memory-map a file and read it without copying it into memory first."""
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        reader = cls(mapped, zero_copy=True)
+        reader._mmap = mapped
+        return reader
+
+    def close(self):
+        """Release the view on the buffer and unmap the file, if any.
+
+        Views returned by next_bytes must be released before the file can be unmapped.
+        """
+        if isinstance(self.buffer, memoryview):
+            self.buffer.release()
+
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
     def print_offset_hex(self):
         print(f"Offset: {self.offset} (0x{self.offset:02X})")
@@ -15,37 +102,66 @@ class BufferReader:
         return byte
 
     def next_float(self):
-        b = self.next_bytes(4)
-        val = struct.unpack("f", b)
-        return val[0]
+        value = _FLOAT.unpack_from(self.buffer, self.offset)[0]
+        self.offset += 4
+        return value
 
     def next_int32(self):
-        value = int.from_bytes(self.buffer[self.offset:self.offset+4], byteorder='little', signed=True)
+        value = _INT32.unpack_from(self.buffer, self.offset)[0]
         self.offset += 4
         return value
 
     def next_int64(self):
-        value = int.from_bytes(self.buffer[self.offset:self.offset+8], byteorder='little', signed=True)
+        value = _INT64.unpack_from(self.buffer, self.offset)[0]
         self.offset += 8
         return value
 
+    def next_struct(self, layout: struct.Struct) -> tuple:
+        """Decode a whole fixed-size block with a precompiled layout in one call."""
+        values = layout.unpack_from(self.buffer, self.offset)
+        self.offset += layout.size
+        return values
+
+    def next_array(self, typecode: str, count: int) -> array:
+        """Decode `count` little-endian fixed-width values in bulk into a typed array."""
+        values = array(typecode)
+        values.frombytes(self.next_bytes(count * values.itemsize))
+
+        if sys.byteorder == "big":
+            values.byteswap()
+
+        return values
+
     def next_string(self):
         length = self.next_int32()
 
-        value: str = self.buffer[self.offset:self.offset+length].decode("utf-8")
+        raw = self.buffer[self.offset:self.offset+length]
         self.offset += length
-        return value.strip("\x00")
+
+        if self.string_cache is not None:
+            # views and bytearrays are not hashable (nor safe to keep as keys), the key is a copy of the raw bytes
+            return self.string_cache.decode(raw if isinstance(raw, bytes) else bytes(raw))
+
+        # str() decodes straight from the buffer, no intermediate bytes for memoryviews
+        return _decode_string(raw)
 
     def next_guid(self):  # 16 byte guid
-        value = self.buffer[self.offset:self.offset+16]
+        # always materialized, guids are stored on the decoded objects and must not pin the buffer
+        value = bytes(self.buffer[self.offset:self.offset+16])
         self.offset += 16
         return value
 
     def next_bytes(self, length):
+        """Read the next bytes. In zero-copy mode this is a view into the buffer."""
         value = self.buffer[self.offset:self.offset+length]
         self.offset += length
         return value
 
+    @property
+    def position(self) -> int:
+        """Offset in the whole input, reported to tracers. Readers over a window of a stream override it."""
+        return self.offset
+
     def skip_forward(self, offset):
         self.offset += offset
 
@@ -1,57 +1,75 @@
 import struct
-from typing import Callable
+import sys
+from array import array
+
+_INT32 = struct.Struct("<i")
+_INT64 = struct.Struct("<q")
+_FLOAT = struct.Struct("<f")
 
 
 class BufferWriter:
     def __init__(self):
+        # appended to only, bytearray over-allocates geometrically on its own
         self.buffer = bytearray()
 
-    def reserve_write_length_padded(self) -> Callable[[], callable]:
-        """Reserve space for the length of a property that will be written later.
+        # pending length slots, two entries each: offset of the slot, offset the length is measured from
+        self._slots: list[int] = []
 
-        Assumes the property might be written with a padding, only measuring after the padding.
-        :return: A function that will write the length of the property to the reserved space.
-        """
+    def __len__(self):
+        return len(self.buffer)
 
-        offset = len(self.buffer)
-        self.buffer.extend(b"\x00" * 4)
-        written = False
+    def getbuffer(self) -> memoryview:
+        """The written data, without copying it. The writer can't grow while the view is alive."""
+        return memoryview(self.buffer)
 
-        def inner():
-            data_offset = len(self.buffer)
+    def push_length(self):
+        """Reserve an int32 for the length of what follows, written by the matching pop_length.
 
-            def write():
-                nonlocal written
-                if not written:
-                    length = data_offset - (offset + 4)
-                    val = length.to_bytes(4, byteorder='little', signed=True)
-                    self.buffer[offset:offset+4] = val
-                    written = True
+        The length is measured from right after the slot, or from where start_data was called.
+        """
+        offset = len(self.buffer)
+        self.buffer.extend(b"\x00\x00\x00\x00")
+        self._slots.append(offset)
+        self._slots.append(offset + 4)
 
-            return write
+    def start_data(self):
+        """Measure the innermost pending length from here, e.g. to exclude a padding."""
+        self._slots[-1] = len(self.buffer)
 
-        return inner
+    def pop_length(self):
+        """Write the innermost pending length."""
+        data_offset = self._slots.pop()
+        _INT32.pack_into(self.buffer, self._slots.pop(), len(self.buffer) - data_offset)
 
     def next_byte(self, v: int):
         self.buffer.append(v)
 
     def next_float(self, v: float):
-        val = struct.pack("f", v)
-        self.buffer.extend(val)
+        self.buffer.extend(_FLOAT.pack(v))
 
     def next_int32(self, v: int):
-        val = v.to_bytes(4, byteorder='little', signed=True)
-        self.buffer.extend(val)
+        self.buffer.extend(_INT32.pack(v))
 
     def next_int64(self, v: int):
-        val = v.to_bytes(8, byteorder='little', signed=True)
-        self.buffer.extend(val)
+        self.buffer.extend(_INT64.pack(v))
+
+    def next_struct(self, layout: struct.Struct, *values):
+        """Encode a whole fixed-size block with a precompiled layout in one call."""
+        self.buffer.extend(layout.pack(*values))
+
+    def next_array(self, values: array):
+        """Encode a typed array in bulk as little-endian fixed-width values."""
+        if sys.byteorder == "big":
+            values = array(values.typecode, values)
+            values.byteswap()
+
+        self.buffer.extend(memoryview(values).cast("B"))
 
     def next_string(self, v: str):
-        v += "\x00"
         val = v.encode("utf-8")
-        self.next_int32(len(val))
+        self.buffer.extend(_INT32.pack(len(val) + 1))
         self.buffer.extend(val)
+        self.buffer.append(0)
 
     def next_guid(self, guid: bytes):  # 16 byte guid
         self.buffer.extend(guid)
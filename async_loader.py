@@ -0,0 +1,53 @@
+import asyncio
+from concurrent.futures import Executor
+
+from BufferReader import BufferReader
+from parser import parse_content
+from structure import BpBlueprint
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _parse_bytes(content: bytes, lazy: bool) -> BpBlueprint:
+    # one decompression thread, concurrency comes from the loads running side by side
+    return parse_content(BufferReader(content, zero_copy=True), lazy, decompress_workers=1)
+
+
+def _load_file(path: str, lazy: bool) -> BpBlueprint:
+    return _parse_bytes(_read_file(path), lazy)
+
+
+class BpAsyncLoader:
+    """Loads blueprints without blocking the event loop.
+
+    File reads, decompression and decoding run on an executor, at most `max_concurrency` loads at a time. By default
+    the loop's default thread pool is used. Pass a ProcessPoolExecutor to decode on several cores.
+    """
+
+    def __init__(self, max_concurrency: int = 8, executor: Executor | None = None, lazy: bool = False):
+        """
+        :param lazy: Decode object properties on first access, see BpBodyReader.
+            Lazy objects can't be sent back from a ProcessPoolExecutor.
+        """
+        self.executor = executor
+        self.lazy = lazy
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def load(self, path: str) -> BpBlueprint:
+        """Read and parse a .sbp file."""
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, _load_file, path, self.lazy)
+
+    async def load_bytes(self, content: bytes) -> BpBlueprint:
+        """Parse the contents of a .sbp file, e.g. an upload that is already in memory."""
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, _parse_bytes, content, self.lazy)
+
+    async def load_many(self, paths: list[str], return_exceptions: bool = False) -> list[BpBlueprint]:
+        """Load many files concurrently, bounded by the loader's concurrency limit. Results are in input order."""
+        return await asyncio.gather(*(self.load(path) for path in paths), return_exceptions=return_exceptions)
@@ -0,0 +1,182 @@
+"""Parse a whole library of blueprints on a process pool.
+
+    python batch.py <directory or glob> [--workers N] [--chunksize N] [--manifest-only]
+"""
+import argparse
+import glob
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from queue import Empty
+from typing import Callable, Iterator
+
+from parser import parse_blueprint, read_manifest
+from structure import BpManifest
+
+
+@dataclass(slots=True)
+class BpBatchResult:
+    path: str
+    result: object = None
+    error: str | None = None
+
+
+@dataclass(slots=True)
+class BpBlueprintSummary:
+    object_count: int
+    actor_count: int
+    dimensions: tuple[int, int, int]
+
+
+def collect_paths(target: str) -> list[str]:
+    """All .sbp files in a directory (recursively), or all files matching a glob."""
+    if os.path.isdir(target):
+        target = os.path.join(target, "**", "*.sbp")
+
+    return sorted(glob.glob(target, recursive=True))
+
+
+def summarize_blueprint(path: str) -> BpBlueprintSummary:
+    """Parse a blueprint and only keep what the CLI prints, so workers don't send whole object graphs back."""
+    blueprint = parse_blueprint(path, decompress_workers=1)
+    actor_count = sum(1 for obj in blueprint.objects if obj.header.type_flag == 1)
+
+    return BpBlueprintSummary(len(blueprint.objects), actor_count, blueprint.manifest.dimensions)
+
+
+def _parse_chunk(paths: list[str], parse: Callable[[str], object], queue=None) -> list[BpBatchResult]:
+    """Parse some files. With a queue, each result is put on it as soon as it is done and nothing is returned."""
+    results = []
+
+    for path in paths:
+        try:
+            result = BpBatchResult(path, parse(path))
+        except Exception as e:
+            result = BpBatchResult(path, error=f"{type(e).__name__}: {e}")
+
+        if queue is None:
+            results.append(result)
+        else:
+            queue.put(result)
+
+    return results
+
+
+def iter_parse(paths: list[str], parse: Callable[[str], object] = summarize_blueprint, workers: int | None = None,
+               chunksize: int = 1) -> Iterator[BpBatchResult]:
+    """Parse files on a process pool and yield the result of each file as soon as it finishes.
+
+    Results are not kept after they were yielded.
+
+    :param parse: Called with each path in a worker process. Must be picklable, i.e. a module-level function.
+    :param workers: Number of worker processes, defaults to the number of CPUs.
+    :param chunksize: Number of files sent to a worker at once. Results still come back one file at a time.
+    """
+    chunks = [paths[i:i + chunksize] for i in range(0, len(paths), chunksize)]
+
+    if chunksize == 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = {executor.submit(_parse_chunk, chunk, parse) for chunk in chunks}
+
+            for future in as_completed(pending):
+                pending.discard(future)
+                yield from future.result()
+
+        return
+
+    # a chunk only returns once all of its files are done, so the workers send each result through a queue instead
+    with multiprocessing.Manager() as manager, ProcessPoolExecutor(max_workers=workers) as executor:
+        queue = manager.Queue()
+        pending = {executor.submit(_parse_chunk, chunk, parse, queue) for chunk in chunks}
+
+        for i in range(len(paths)):
+            while True:
+                try:
+                    result = queue.get(timeout=0.1)
+                    break
+                except Empty:
+                    # a chunk that failed as a whole (e.g. a crashed worker) never sends its results, raise its error
+                    for future in [future for future in pending if future.done()]:
+                        pending.discard(future)
+                        future.result()
+
+            yield result
+
+
+def iter_manifests(paths: list[str], workers: int | None = None) -> Iterator[BpBatchResult]:
+    """Read the manifests of many files on a thread pool, yielding each as soon as it is read.
+
+    Only the file prefixes are read and nothing is decompressed, so this is I/O bound and threads are enough.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_parse_chunk, [path], read_manifest) for path in paths]
+
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+def bill_of_materials(manifests: Iterator[BpManifest]) -> dict[str, int]:
+    """Total amount of every material over many blueprints."""
+    totals = {}
+
+    for manifest in manifests:
+        for material in manifest.materials:
+            totals[material.item] = totals.get(material.item, 0) + material.amount
+
+    return totals
+
+
+def _print_manifests(paths: list[str], workers: int | None) -> int:
+    manifests = []
+    failed = 0
+
+    for result in iter_manifests(paths, workers):
+        if result.error is not None:
+            failed += 1
+            print(f"{result.path}: ERROR {result.error}")
+        else:
+            manifests.append(result.result)
+            print(f"{result.path}: {len(result.result.materials)} materials, "
+                  f"{len(result.result.building_types)} building types")
+
+    print("\nBill of materials ====================================================================")
+
+    for item, amount in sorted(bill_of_materials(manifests).items()):
+        print(f"\t{amount} x {item}")
+
+    return failed
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Parse all blueprints of a directory or glob.")
+    arg_parser.add_argument("target", help="directory (searched recursively for .sbp files) or glob")
+    arg_parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    arg_parser.add_argument("--chunksize", type=int, default=1, help="files sent to a worker at once")
+    arg_parser.add_argument("--manifest-only", action="store_true",
+                            help="only read the manifests and print the total bill of materials")
+    args = arg_parser.parse_args()
+
+    paths = collect_paths(args.target)
+
+    if args.manifest_only:
+        failed = _print_manifests(paths, args.workers)
+        print(f"{len(paths) - failed}/{len(paths)} manifests read")
+        return
+
+    failed = 0
+
+    for result in iter_parse(paths, workers=args.workers, chunksize=args.chunksize):
+        if result.error is not None:
+            failed += 1
+            print(f"{result.path}: ERROR {result.error}")
+        else:
+            summary = result.result
+            print(f"{result.path}: {summary.object_count} objects ({summary.actor_count} actors), "
+                  f"{summary.dimensions[0]}m x {summary.dimensions[1]}m x {summary.dimensions[2]}m")
+
+    print(f"{len(paths) - failed}/{len(paths)} blueprints parsed")
+
+
+if __name__ == "__main__":
+    main()
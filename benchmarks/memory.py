@@ -0,0 +1,91 @@
+"""Per-object memory footprint of the structure.py types, before and after slotting.
+
+"Before" rebuilds every type as a plain dataclass with a per-instance __dict__, and typed structs as a
+TypedData wrapping a dict, which is what structure.py used to do.
+
+Run from the repository root:  python -m benchmarks.memory [count]
+"""
+import dataclasses
+import sys
+import tracemalloc
+
+from structure import BpActorHeader, BpComponentHeader, BpObjectReference, BpStructProperty, BpFloatProperty, \
+    BpObjectProperty, BpVector, BpLinearColor
+
+
+def _unslotted(cls):
+    return dataclasses.make_dataclass(cls.__name__, [(field.name, field.type) for field in dataclasses.fields(cls)])
+
+
+@dataclasses.dataclass
+class TypedData:
+    data_type: str
+    data: dict
+
+
+LEGACY = {cls: _unslotted(cls) for cls in (BpActorHeader, BpComponentHeader, BpObjectReference, BpStructProperty,
+                                           BpFloatProperty, BpObjectProperty)}
+
+
+def _make_objects(count: int, legacy: bool) -> list:
+    types = LEGACY if legacy else {cls: cls for cls in LEGACY}
+
+    actor_header = types[BpActorHeader]
+    component_header = types[BpComponentHeader]
+    reference = types[BpObjectReference]
+    struct_property = types[BpStructProperty]
+    float_property = types[BpFloatProperty]
+    object_property = types[BpObjectProperty]
+
+    objects = []
+    for i in range(count):
+        # floats are made unique per object, like real transforms, so they are counted in both variants
+        x = float(i)
+
+        if legacy:
+            location = TypedData("Vector", {"x": x, "y": x + 1, "z": x + 2})
+            color = TypedData("LinearColor", {"r": x, "g": x + 1, "b": x + 2, "a": x + 3})
+        else:
+            location = BpVector(x, x + 1, x + 2)
+            color = BpLinearColor(x, x + 1, x + 2, x + 3)
+
+        objects.append((
+            actor_header(1, "/Game/Foundation.Foundation_C", "Persistent_Level", "Foundation", True,
+                         x, x + 1, x + 2, x + 3, x + 4, x + 5, x + 6, x + 7, x + 8, x + 9, False),
+            component_header(0, "/Script/FactoryGame.FGColoredInstanceMeshProxy", "Persistent_Level",
+                             "FGColoredInstanceMeshProxy", "Foundation"),
+            reference("Persistent_Level", "Foundation"),
+            struct_property("mLocation", "StructProperty", "Vector", True, location),
+            struct_property("mColor", "StructProperty", "LinearColor", True, color),
+            float_property("mHealth", "FloatProperty", x),
+            object_property("mRecipe", "ObjectProperty", "", "/Game/Recipe.Recipe_C"),
+        ))
+
+    return objects
+
+
+def measure(count: int, legacy: bool) -> float:
+    """Bytes allocated per blueprint object (one actor, one component and five properties)."""
+    tracemalloc.start()
+    objects = _make_objects(count, legacy)
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    del objects
+    return size / count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    before = measure(count, legacy=True)
+    after = measure(count, legacy=False)
+
+    print(f"{count} objects (actor header, component header, reference, 5 properties each)")
+    print(f"before (__dict__, TypedData): {before:8.1f} bytes/object")
+    print(f"after  (__slots__, values):   {after:8.1f} bytes/object")
+    print(f"saved:                        {before - after:8.1f} bytes/object ({1 - after / before:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Throughput and peak memory of the readers on synthetic blueprints.
+
+Run from the repository root:  python -m benchmarks.run [--sizes 1000 10000 100000 1000000] [--repeat 3]
+
+Sizes are object counts (actors and their components). For every size and reader this reports objects/s, MB/s of
+input consumed and the peak memory allocated while reading (measured in a separate, traced run).
+"""
+import argparse
+import time
+import tracemalloc
+from typing import Callable
+
+from BufferReader import BufferReader
+from BufferWriter import BufferWriter
+from benchmarks.synthetic import make_objects
+from parser import read_body, write_body
+from reader import BpHeaderReader, BpPropertiesReader, BpBodyReader
+
+
+def _primitives_case(objects) -> tuple[bytes, int, Callable]:
+    writer = BufferWriter()
+    for obj in objects:
+        writer.next_string(obj.header.instance_name)
+        writer.next_int32(obj.header.type_flag)
+        writer.next_float(1.5)
+
+    def run(buffer):
+        reader = BufferReader(buffer, zero_copy=True)
+        return [(reader.next_string(), reader.next_int32(), reader.next_float()) for i in range(len(objects))]
+
+    return bytes(writer.getbuffer()), len(objects), run
+
+
+def _headers_case(objects) -> tuple[bytes, int, Callable]:
+    writer = BufferWriter()
+    BpBodyReader().write_headers(objects, writer)
+
+    def run(buffer):
+        reader = BufferReader(buffer, zero_copy=True)
+        header_reader = BpHeaderReader()
+        return [header_reader.read(reader) for i in range(reader.next_int32())]
+
+    return bytes(writer.getbuffer()), len(objects), run
+
+
+def _properties_case(objects) -> tuple[bytes, int, Callable]:
+    writer = BufferWriter()
+    properties_reader = BpPropertiesReader()
+    for obj in objects:
+        properties_reader.write(obj.properties, writer)
+
+    def run(buffer):
+        reader = BufferReader(buffer, zero_copy=True)
+        return [properties_reader.read(reader) for i in range(len(objects))]
+
+    return bytes(writer.getbuffer()), len(objects), run
+
+
+def _body_case(objects) -> tuple[bytes, int, Callable]:
+    return bytes(write_body(objects)), len(objects), read_body
+
+
+CASES = {
+    "BufferReader": _primitives_case,
+    "BpHeaderReader": _headers_case,
+    "BpPropertyReader": _properties_case,
+    "BpBodyReader": _body_case,
+}
+
+
+def bench(run: Callable, buffer: bytes, repeat: int) -> tuple[float, int]:
+    """Best wall time of `repeat` runs, and the peak traced memory of one more run.
+
+    Every run returns what it decoded, so the peak includes the decoded values.
+    """
+    best = float("inf")
+    for i in range(repeat):
+        start = time.perf_counter()
+        run(buffer)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    result = run(buffer)
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return best, peak
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark the readers on synthetic blueprints.")
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    arg_parser.add_argument("--components", type=int, default=1, help="components per actor")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--cases", nargs="+", default=list(CASES), choices=list(CASES))
+    args = arg_parser.parse_args()
+
+    print(f"{'case':<18}{'objects':>10}{'input MB':>10}{'time s':>10}{'objects/s':>12}{'MB/s':>9}{'peak MB':>9}")
+
+    for size in args.sizes:
+        objects = make_objects(max(1, size // (1 + args.components)), args.components)
+
+        for name in args.cases:
+            buffer, count, run = CASES[name](objects)
+            elapsed, peak = bench(run, buffer, args.repeat)
+            megabytes = len(buffer) / 1e6
+
+            print(f"{name:<18}{count:>10}{megabytes:>10.2f}{elapsed:>10.3f}{count / elapsed:>12,.0f}"
+                  f"{megabytes / elapsed:>9.1f}{peak / 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
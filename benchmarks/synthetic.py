@@ -0,0 +1,93 @@
+"""Synthetic blueprints of configurable size, encoded with the regular writers.
+
+Run from the repository root:  python -m benchmarks.synthetic <actors> [--components N] [-o out.sbp]
+"""
+import argparse
+import random
+from array import array
+
+from parser import encode_blueprint
+from structure import BpActorHeader, BpComponentHeader, BpObject, BpObjectReference, BpStructProperty, \
+    BpValueArrayProperty, BpObjectProperty, BpFloatProperty, BpByteProperty, BpLinearColor, \
+    BpVector, BpManifest, BpItemAmount, BpBlueprint
+
+TYPE_PATHS = [
+    "/Game/FactoryGame/Buildable/Building/Foundation/Build_Foundation_8x4_01.Build_Foundation_8x4_01_C",
+    "/Game/FactoryGame/Buildable/Factory/ConstructorMk1/Build_ConstructorMk1.Build_ConstructorMk1_C",
+    "/Game/FactoryGame/Buildable/Factory/ConveyorBeltMk1/Build_ConveyorBeltMk1.Build_ConveyorBeltMk1_C",
+    "/Game/FactoryGame/Buildable/Factory/PowerPoleMk1/Build_PowerPoleMk1.Build_PowerPoleMk1_C",
+]
+COMPONENT_TYPE_PATH = "/Script/FactoryGame.FGFactoryConnectionComponent"
+LEVEL = "Persistent_Level"
+
+
+def _actor_properties(rng: random.Random, i: int) -> list:
+    """One of each: typed struct, nested struct, array, object, float and byte property."""
+    return [
+        BpStructProperty("mColorSlot", "StructProperty", "LinearColor", True,
+                         BpLinearColor(rng.random(), rng.random(), rng.random(), 1.0)),
+        BpStructProperty("mCustomizationData", "StructProperty", "FactoryCustomizationData", False, [
+            BpObjectProperty("SwatchDesc", "ObjectProperty", "", "/Game/FactoryGame/Buildable/-Shared/Swatch.Swatch_C"),
+            BpStructProperty("mOffset", "StructProperty", "Vector", True,
+                             BpVector(rng.uniform(-1, 1), rng.uniform(-1, 1), 0.0)),
+            None,
+        ]),
+        BpValueArrayProperty("mInventoryIds", "ArrayProperty", "IntProperty",
+                             array("i", (rng.randrange(1 << 20) for j in range(8)))),
+        BpObjectProperty("mCurrentRecipe", "ObjectProperty", "", f"/Game/Recipes/Recipe_{i % 16}.Recipe_{i % 16}_C"),
+        BpFloatProperty("mCurrentPotential", "FloatProperty", rng.choice((0.5, 1.0, 1.5, 2.5))),
+        BpByteProperty("mPendingPotential", "ByteProperty", "None", rng.randrange(256)),
+        None,
+    ]
+
+
+def make_objects(actors: int, components_per_actor: int = 1, seed: int = 0) -> list[BpObject]:
+    rng = random.Random(seed)
+    objects = []
+
+    for i in range(actors):
+        instance_name = f"{LEVEL}:PersistentLevel.Build_{i}"
+        component_names = [f"{instance_name}.Connection{j}" for j in range(components_per_actor)]
+
+        header = BpActorHeader(1, TYPE_PATHS[i % len(TYPE_PATHS)], LEVEL, instance_name, True,
+                               0.0, 0.0, rng.uniform(-1, 1), rng.uniform(-1, 1),
+                               rng.uniform(-1e5, 1e5), rng.uniform(-1e5, 1e5), rng.uniform(0, 1e4),
+                               1.0, 1.0, 1.0, False)
+        references = [BpObjectReference(LEVEL, name) for name in component_names]
+        objects.append(BpObject(header, "", "", references, _actor_properties(rng, i)))
+
+        for name in component_names:
+            component = BpComponentHeader(0, COMPONENT_TYPE_PATH, LEVEL, name, instance_name)
+            objects.append(BpObject(component, "", "", [], [
+                BpFloatProperty("mConnectorClearance", "FloatProperty", 50.0),
+                None,
+            ]))
+
+    return objects
+
+
+def make_blueprint(actors: int, components_per_actor: int = 1, seed: int = 0) -> BpBlueprint:
+    manifest = BpManifest((2, 46, 300000), (64, 64, 32),
+                          [BpItemAmount("/Game/FactoryGame/Resource/Parts/Cement/Desc_Cement.Desc_Cement_C", actors)],
+                          list(dict.fromkeys(TYPE_PATHS[:actors])))
+    return BpBlueprint(manifest, make_objects(actors, components_per_actor, seed))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Write a synthetic blueprint.")
+    arg_parser.add_argument("actors", type=int)
+    arg_parser.add_argument("--components", type=int, default=1, help="components per actor")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("-o", "--output", default="synthetic.sbp")
+    args = arg_parser.parse_args()
+
+    content = encode_blueprint(make_blueprint(args.actors, args.components, args.seed))
+
+    with open(args.output, "wb") as f:
+        f.write(content)
+
+    print(f"{args.output}: {args.actors} actors, {len(content)} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import dataclasses
+import hashlib
+import marshal
+import os
+import tempfile
+from array import array
+
+import structure
+from BufferReader import BufferReader
+from parser import PARSER_VERSION, parse_content
+from structure import BpBlueprint, BpLazyObject, BpObject, BpReadOnly
+
+# decoded values are stored as nested tuples of primitives and written with marshal, no pickle involved
+CACHE_VERSION = f"p{PARSER_VERSION}m{marshal.version}"
+CACHE_SUFFIX = ".bpcache"
+
+# name -> class of every structure type that can be cached
+_TYPES = {name: cls for name, cls in vars(structure).items()
+          if isinstance(cls, type) and dataclasses.is_dataclass(cls) and cls is not BpLazyObject}
+_FIELDS = {cls: tuple(field.name for field in dataclasses.fields(cls)) for cls in _TYPES.values()}
+
+# every tuple in the encoded tree starts with a tag: a type name from _TYPES, or one of these
+_TUPLE = "tuple"
+_ARRAY = "array"
+
+
+def _encode(value):
+    if isinstance(value, (str, int, float, bool, bytes)) or value is None:
+        return value
+
+    if isinstance(value, list):
+        return [_encode(v) for v in value]
+
+    if isinstance(value, BpLazyObject):
+        return ("BpObject",) + tuple(_encode(getattr(value, name)) for name in _FIELDS[BpObject])
+
+    # shared struct properties are cached as plain copies
+    cls = value.mutable_type if isinstance(value, BpReadOnly) else type(value)
+    if cls in _FIELDS:
+        return (cls.__name__,) + tuple(_encode(getattr(value, name)) for name in _FIELDS[cls])
+
+    if isinstance(value, tuple):
+        return _TUPLE, [_encode(v) for v in value]
+
+    if isinstance(value, array):
+        return _ARRAY, value.typecode, value.tobytes()
+
+    if isinstance(value, dict):
+        return {k: _encode(v) for k, v in value.items()}
+
+    if isinstance(value, memoryview):
+        return value.tobytes()
+
+    raise Exception(f"Can't cache value of type {type(value).__name__}")
+
+
+def _decode(value):
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+
+    if isinstance(value, tuple):
+        tag = value[0]
+
+        if tag == _TUPLE:
+            return tuple(_decode(v) for v in value[1])
+
+        if tag == _ARRAY:
+            values = array(value[1])
+            values.frombytes(value[2])
+            return values
+
+        return _TYPES[tag](*[_decode(v) for v in value[1:]])
+
+    if isinstance(value, dict):
+        return {k: _decode(v) for k, v in value.items()}
+
+    return value
+
+
+def _encode_entry(blueprint: BpBlueprint) -> bytes:
+    return marshal.dumps(_encode(blueprint))
+
+
+def _decode_entry(data: bytes) -> BpBlueprint:
+    return _decode(marshal.loads(data))
+
+
+class BpParseCache:
+    """Content-addressed on-disk cache of parsed blueprints.
+
+    Entries are keyed by a hash of the raw .sbp bytes and the parser version, so a changed file or parser never hits
+    a stale entry. The directory is kept below `max_bytes` by evicting the least recently used entries.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, f"{digest}-{CACHE_VERSION}{CACHE_SUFFIX}")
+
+    def get(self, digest: str) -> BpBlueprint | None:
+        """The cached blueprint, or None if there is no entry or it can't be read."""
+        path = self._path(digest)
+
+        try:
+            with open(path, "rb") as f:
+                blueprint = _decode_entry(f.read())
+
+            if not isinstance(blueprint, BpBlueprint):
+                raise ValueError(f"Not a cached blueprint: {path}")
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, ValueError, TypeError, KeyError, IndexError):
+            # corrupt or unreadable (e.g. truncated by a crash), drop it and parse again
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+        try:
+            os.utime(path)  # the modification time marks the last use
+        except FileNotFoundError:
+            pass  # evicted by another process since it was read, still a hit
+        return blueprint
+
+    def put(self, digest: str, blueprint: BpBlueprint):
+        path = self._path(digest)
+
+        # unique per process and thread, the entry only appears once it is complete
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix=f"{digest}-", suffix=".tmp")
+
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_encode_entry(blueprint))
+
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+        self.evict()
+
+    def evict(self):
+        """Remove entries of other parser versions, then the least recently used ones until under max_bytes."""
+        entries = []
+
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(CACHE_SUFFIX):
+                continue
+
+            # other processes may share the directory and remove entries at any time, skip those
+            try:
+                if not entry.name.endswith(f"-{CACHE_VERSION}{CACHE_SUFFIX}"):
+                    os.remove(entry.path)
+                    continue
+
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for mtime, size, path in entries)
+
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def parse(self, path: str, decompress_workers: int | None = None) -> BpBlueprint:
+        """Parse a .sbp file, or load it from the cache if the same bytes were parsed before."""
+        with BufferReader.from_file(path) as content_reader:
+            digest = hashlib.sha256(content_reader.buffer).hexdigest()
+
+            blueprint = self.get(digest)
+            if blueprint is not None:
+                self.hits += 1
+                return blueprint
+
+            self.misses += 1
+            blueprint = parse_content(content_reader, decompress_workers=decompress_workers)
+
+        self.put(digest, blueprint)
+        return blueprint
@@ -0,0 +1,111 @@
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from BufferReader import BufferReader
+from structure import BpChunkHeader
+
+CHUNK_SIGNATURE = -1641380927
+ARCHIVE_HEADER = 0x22222222
+MAX_CHUNK_SIZE = 128 * 1024
+ALGORITHM_ZLIB = 3
+
+# signature, archive header, max chunk size, algorithm, compressed size, decompressed size (both twice)
+CHUNK_HEADER = struct.Struct("<iiqBqqqq")
+
+
+def read_chunk_header(reader: BufferReader) -> BpChunkHeader:
+    signature = reader.next_int32()
+    if signature != CHUNK_SIGNATURE:
+        raise Exception(f"Invalid signature: {signature}")
+
+    archive_header = reader.next_int32()
+    if archive_header != ARCHIVE_HEADER:
+        raise Exception(f"Invalid archive header: {archive_header}")
+
+    max_chunk_size = reader.next_int64()
+    if max_chunk_size != MAX_CHUNK_SIZE:
+        raise Exception(f"Invalid max chunk size: {max_chunk_size}")
+
+    algorithm = reader.next_byte()
+    if algorithm != ALGORITHM_ZLIB:
+        raise Exception(f"Invalid algorithm: {algorithm}")  # assume always zlib
+
+    compressed_size = reader.next_int64()
+    decompressed_size = reader.next_int64()
+
+    if compressed_size != reader.next_int64():
+        raise Exception("Compressed size mismatch")
+    if decompressed_size != reader.next_int64():
+        raise Exception("Decompressed size mismatch")
+
+    return BpChunkHeader(compressed_size, decompressed_size, reader.offset)
+
+
+def read_chunk_headers(reader: BufferReader) -> list[BpChunkHeader]:
+    """Walk the chunk chain from the current offset to the end of the buffer."""
+    chunks = []
+
+    while reader.offset < len(reader.buffer):
+        chunk = read_chunk_header(reader)
+
+        if chunk.data_offset + chunk.compressed_size > len(reader.buffer):
+            raise Exception(f"Chunk {len(chunks)} is out of bounds: {chunk}")
+
+        reader.skip_forward(chunk.compressed_size)
+        chunks.append(chunk)
+
+    return chunks
+
+
+def _decompress_chunk(data, chunk: BpChunkHeader) -> bytes:
+    end = chunk.data_offset + chunk.compressed_size
+    decompressed = zlib.decompress(data[chunk.data_offset:end])
+
+    if len(decompressed) != chunk.decompressed_size:
+        raise Exception(f"Invalid decompressed chunk size: {len(decompressed)} != {chunk.decompressed_size}")
+
+    return decompressed
+
+
+def decompress_chunks(buffer, chunks: list[BpChunkHeader], max_workers: int | None = None) -> bytes:
+    """Inflate all chunks on a thread pool and join them into one contiguous body.
+
+    zlib releases the GIL while inflating, so the chunks are decompressed in parallel.
+    """
+    data = memoryview(buffer)  # slicing a view does not copy the compressed chunks
+
+    if len(chunks) == 1:
+        return _decompress_chunk(data, chunks[0])
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return b"".join(executor.map(lambda chunk: _decompress_chunk(data, chunk), chunks))
+
+
+def decompress_body(reader: BufferReader, max_workers: int | None = None) -> bytes:
+    """Read the chunk chain starting at the reader's offset and return the decompressed body."""
+    chunks = read_chunk_headers(reader)
+
+    if not chunks:
+        raise Exception("No compressed chunks found")
+
+    return decompress_chunks(reader.buffer, chunks, max_workers)
+
+
+def _compress_chunk(chunk, level: int) -> bytes:
+    compressed = zlib.compress(chunk, level)
+    header = CHUNK_HEADER.pack(CHUNK_SIGNATURE, ARCHIVE_HEADER, MAX_CHUNK_SIZE, ALGORITHM_ZLIB,
+                               len(compressed), len(chunk), len(compressed), len(chunk))
+    return header + compressed
+
+
+def compress_body(body, max_workers: int | None = None, level: int = zlib.Z_DEFAULT_COMPRESSION) -> bytes:
+    """Split a body into 128 KiB chunks and compress them on a thread pool into a chunk chain."""
+    data = memoryview(body)
+    chunks = [data[i:i + MAX_CHUNK_SIZE] for i in range(0, max(len(data), 1), MAX_CHUNK_SIZE)]
+
+    if len(chunks) == 1:
+        return _compress_chunk(chunks[0], level)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return b"".join(executor.map(lambda chunk: _compress_chunk(chunk, level), chunks))
@@ -0,0 +1,155 @@
+"""Diff two revisions of a blueprint.
+
+    python diff.py <old.sbp> <new.sbp>
+"""
+import argparse
+import dataclasses
+import hashlib
+from dataclasses import dataclass
+
+from BufferReader import BufferReader, StringCache
+from compression import decompress_body
+from parser import read_body
+from reader import TRANSFORM_FIELDS, BpBodyReader, BpManifestReader
+from structure import BpActorHeader, BpLazyObject
+
+# change kinds
+ADDED = "added"
+REMOVED = "removed"
+MOVED = "moved"  # rotation, position or scale of an actor
+HEADER = "header"  # any other header field
+REFERENCES = "references"  # parent or component references
+PROPERTY = "property"  # old or new is None if the property was added or removed
+
+
+@dataclass(slots=True)
+class BpChange:
+    kind: str
+    instance_name: str
+    name: str | None = None  # property or header field
+    old: object = None
+    new: object = None
+
+
+def _entity_hashes(body, objects: list[BpLazyObject]) -> list[bytes]:
+    """Hash of the raw entity bytes of every object: parent, references and properties."""
+    data = memoryview(body)
+    return [hashlib.blake2b(data[obj.offset:obj.offset + obj.size], digest_size=16).digest() for obj in objects]
+
+
+def _diff_headers(old: BpLazyObject, new: BpLazyObject, changes: list[BpChange]):
+    instance_name = new.header.instance_name
+
+    if type(old.header) is not type(new.header):
+        changes.append(BpChange(HEADER, instance_name, "type_flag", old.header.type_flag, new.header.type_flag))
+        return
+
+    fields = [field.name for field in dataclasses.fields(new.header)]
+
+    if isinstance(new.header, BpActorHeader):
+        old_transform = tuple(getattr(old.header, name) for name in TRANSFORM_FIELDS)
+        new_transform = tuple(getattr(new.header, name) for name in TRANSFORM_FIELDS)
+
+        if old_transform != new_transform:
+            changes.append(BpChange(MOVED, instance_name, None, old_transform, new_transform))
+
+        fields = [name for name in fields if name not in TRANSFORM_FIELDS]
+
+    for name in fields:
+        old_value = getattr(old.header, name)
+        new_value = getattr(new.header, name)
+
+        if old_value != new_value:
+            changes.append(BpChange(HEADER, instance_name, name, old_value, new_value))
+
+
+def _diff_entities(old: BpLazyObject, new: BpLazyObject, changes: list[BpChange]):
+    instance_name = new.header.instance_name
+
+    if (old.parent_root, old.parent_object_name, old.references) != \
+            (new.parent_root, new.parent_object_name, new.references):
+        changes.append(BpChange(REFERENCES, instance_name, None,
+                                (old.parent_root, old.parent_object_name, old.references),
+                                (new.parent_root, new.parent_object_name, new.references)))
+
+    old_properties = {prop.name: prop for prop in old.properties if prop is not None}
+    new_properties = {prop.name: prop for prop in new.properties if prop is not None}
+
+    for name in [*old_properties, *(name for name in new_properties if name not in old_properties)]:
+        old_prop = old_properties.get(name)
+        new_prop = new_properties.get(name)
+
+        if old_prop != new_prop:
+            changes.append(BpChange(PROPERTY, instance_name, name, old_prop, new_prop))
+
+
+def diff_bodies(old_body, new_body) -> list[BpChange]:
+    """Changes between two decompressed bodies, matching objects by instance name.
+
+    Both bodies are read lazily and the raw bytes of every entity are hashed. Only the properties of objects whose
+    hashes differ are decoded and compared.
+    """
+    string_cache = StringCache()
+    old_objects = read_body(old_body, BpBodyReader(lazy=True), string_cache=string_cache)
+    new_objects = read_body(new_body, BpBodyReader(lazy=True), string_cache=string_cache)
+
+    old_hashes = dict(zip((obj.header.instance_name for obj in old_objects), _entity_hashes(old_body, old_objects)))
+    old_by_name = {obj.header.instance_name: obj for obj in old_objects}
+
+    changes = []
+    new_names = set()
+
+    for obj, entity_hash in zip(new_objects, _entity_hashes(new_body, new_objects)):
+        instance_name = obj.header.instance_name
+        new_names.add(instance_name)
+
+        old = old_by_name.get(instance_name)
+        if old is None:
+            changes.append(BpChange(ADDED, instance_name, None, None, obj))
+            continue
+
+        if old.header != obj.header:
+            _diff_headers(old, obj, changes)
+
+        if old_hashes[instance_name] != entity_hash:
+            _diff_entities(old, obj, changes)
+
+    for obj in old_objects:
+        if obj.header.instance_name not in new_names:
+            changes.append(BpChange(REMOVED, obj.header.instance_name, None, obj, None))
+
+    return changes
+
+
+def _read_decompressed(path: str) -> bytes:
+    with BufferReader.from_file(path) as content_reader:
+        BpManifestReader().read(content_reader)
+        return decompress_body(content_reader)
+
+
+def diff_files(old_path: str, new_path: str) -> list[BpChange]:
+    """Changes between two .sbp files, see diff_bodies."""
+    return diff_bodies(_read_decompressed(old_path), _read_decompressed(new_path))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Show what changed between two revisions of a blueprint.")
+    arg_parser.add_argument("old")
+    arg_parser.add_argument("new")
+    args = arg_parser.parse_args()
+
+    changes = diff_files(args.old, args.new)
+
+    for change in changes:
+        if change.kind in (ADDED, REMOVED):
+            print(f"{change.kind:<10} {change.instance_name}")
+        elif change.name is None:
+            print(f"{change.kind:<10} {change.instance_name}: {change.old} -> {change.new}")
+        else:
+            print(f"{change.kind:<10} {change.instance_name}.{change.name}: {change.old} -> {change.new}")
+
+    print(f"{len(changes)} changes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import dataclasses
+import json
+from array import array
+from typing import Iterable, TextIO
+
+# class -> names of its dataclass fields, filled on first use
+_FIELDS: dict[type, tuple[str, ...]] = {}
+
+
+def _fields(cls: type) -> tuple[str, ...]:
+    fields = _FIELDS.get(cls)
+
+    if fields is None:
+        fields = _FIELDS[cls] = tuple(field.name for field in dataclasses.fields(cls))
+
+    return fields
+
+
+def _default(o):
+    """Shallow conversion of the types json can't encode. The encoder recurses into the result itself."""
+    if dataclasses.is_dataclass(o):
+        return {name: getattr(o, name) for name in _fields(type(o))}
+
+    if isinstance(o, (bytes, bytearray, memoryview)):
+        return o.hex()
+
+    if isinstance(o, array):
+        return o.tolist()
+
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+_ENCODER = json.JSONEncoder(default=_default, check_circular=False)
+_COMPACT_ENCODER = json.JSONEncoder(default=_default, check_circular=False, separators=(",", ":"))
+
+
+def to_json(obj, indent: int | None = None, compact: bool = False) -> str:
+    """Encode a structure object (or a list of them) as JSON."""
+    if indent is not None:
+        return json.dumps(obj, default=_default, check_circular=False, indent=indent)
+
+    return (_COMPACT_ENCODER if compact else _ENCODER).encode(obj)
+
+
+def write_ndjson(objects: Iterable, fp: TextIO, compact: bool = False) -> int:
+    """Write one object per line to a file handle, without building the whole document in memory.
+
+    :param compact: Leave out the spaces after separators.
+    :return: Number of objects written.
+    """
+    encode = (_COMPACT_ENCODER if compact else _ENCODER).encode
+    count = 0
+
+    for obj in objects:
+        fp.write(encode(obj))
+        fp.write("\n")
+        count += 1
+
+    return count
+
+
+def export_ndjson(objects: Iterable, path: str, compact: bool = False) -> int:
+    with open(path, "w", encoding="utf-8") as f:
+        return write_ndjson(objects, f, compact)
@@ -0,0 +1,132 @@
+import hashlib
+import os
+
+from BufferReader import BufferReader
+from BufferWriter import BufferWriter
+from reader import BpBodyReader, BpHeaderReader
+from structure import BpHeader, BpIndexEntry, BpObject
+
+INDEX_MAGIC = b"BPIX"
+INDEX_VERSION = 2
+
+
+def hash_source(content) -> bytes:
+    """Hash of the raw .sbp file, used to check that an index still belongs to it."""
+    return hashlib.sha256(content).digest()
+
+
+def index_path_for(body_path: str) -> str:
+    return body_path + ".idx"
+
+
+class BpEntityIndex:
+    """Random-access index over a decompressed body: entity number -> (type_path, header offset, offset, size)."""
+
+    def __init__(self, entries: list[BpIndexEntry], source_hash: bytes, entity_data_offset: int = 0):
+        self.entries = entries
+        self.source_hash = source_hash
+
+        # offset of the entity data (uk1, entity count and the entities), right after the header table
+        self.entity_data_offset = entity_data_offset
+
+    @classmethod
+    def build(cls, reader: BufferReader, source_hash: bytes) -> "BpEntityIndex":
+        """Index a body, starting at its object count. Only headers are decoded, properties are skipped."""
+        entries = []
+        header_reader = BpHeaderReader()
+
+        object_count = reader.next_int32()
+
+        for i in range(object_count):
+            header_offset = reader.offset
+            header = header_reader.read(reader)
+            entries.append(BpIndexEntry(header.type_path, header_offset, 0, 0))
+
+        entity_data_offset = reader.offset
+        uk1 = reader.next_int32()
+
+        entity_count = reader.next_int32()
+
+        for i in range(entity_count):
+            entry = entries[i]
+            entry.offset = reader.offset
+            entry.size = reader.next_int32()
+            reader.skip_forward(entry.size)
+
+        return cls(entries, source_hash, entity_data_offset)
+
+    @classmethod
+    def load(cls, path: str, source_hash: bytes) -> "BpEntityIndex | None":
+        """Load an index sidecar. Returns None if it is missing, outdated or belongs to another source file."""
+        if not os.path.exists(path):
+            return None
+
+        with open(path, "rb") as f:
+            reader = BufferReader(f.read())
+
+        if reader.next_bytes(4) != INDEX_MAGIC or reader.next_int32() != INDEX_VERSION:
+            return None
+
+        if reader.next_bytes(32) != source_hash:
+            return None
+
+        entity_data_offset = reader.next_int64()
+
+        type_paths = [reader.next_string() for i in range(reader.next_int32())]
+
+        entries = []
+        for i in range(reader.next_int32()):
+            type_path = type_paths[reader.next_int32()]
+            header_offset = reader.next_int64()
+            offset = reader.next_int64()
+            size = reader.next_int32()
+            entries.append(BpIndexEntry(type_path, header_offset, offset, size))
+
+        return cls(entries, source_hash, entity_data_offset)
+
+    def write(self, path: str):
+        writer = BufferWriter()
+
+        writer.next_bytes(INDEX_MAGIC)
+        writer.next_int32(INDEX_VERSION)
+        writer.next_bytes(self.source_hash)
+        writer.next_int64(self.entity_data_offset)
+
+        # type paths repeat a lot, store each once
+        type_paths = {}
+        for entry in self.entries:
+            type_paths.setdefault(entry.type_path, len(type_paths))
+
+        writer.next_int32(len(type_paths))
+        for type_path in type_paths:
+            writer.next_string(type_path)
+
+        writer.next_int32(len(self.entries))
+        for entry in self.entries:
+            writer.next_int32(type_paths[entry.type_path])
+            writer.next_int64(entry.header_offset)
+            writer.next_int64(entry.offset)
+            writer.next_int32(entry.size)
+
+        with open(path, "wb") as f:
+            f.write(writer.getbuffer())
+
+    def find(self, type_path: str) -> list[int]:
+        """Entity numbers of all objects of a type."""
+        return [i for i, entry in enumerate(self.entries) if entry.type_path == type_path]
+
+    def read_header(self, reader: BufferReader, number: int) -> BpHeader:
+        reader.set_offset(self.entries[number].header_offset)
+        return BpHeaderReader().read(reader)
+
+    def read_object(self, reader: BufferReader, number: int, body_reader: BpBodyReader = None) -> BpObject:
+        """Decode a single object by seeking straight to its header and entity data."""
+        body_reader = body_reader or BpBodyReader()
+        header = self.read_header(reader, number)
+
+        reader.set_offset(self.entries[number].offset)
+        return body_reader.read_entity(reader, number, header)
+
+    def read_objects(self, reader: BufferReader, type_path: str, body_reader: BpBodyReader = None) -> list[BpObject]:
+        """Decode all objects of a type."""
+        return [self.read_object(reader, number, body_reader) for number in self.find(type_path)]
@@ -1,115 +1,182 @@
-import json
-import zlib
-
-from BufferReader import BufferReader
-from reader import BpBodyReader
+import struct
+import sys
+import time
+
+from BufferReader import BufferReader, StringCache
+from BufferWriter import BufferWriter
+from compression import compress_body, decompress_body
+from export import write_ndjson
+from index import BpEntityIndex, hash_source, index_path_for
+from reader import BpBodyReader, BpManifestReader, BpStructCache
+from structure import BpBlueprint, BpManifest, BpObject
+from tracing import ProfilingTracer
+
+# bump when the decoded structures change, invalidates cached parse results
+PARSER_VERSION = 1
 
 # open file
 path = r"Z:\Docs\Satisfactory\Blueprint Analysis\colorfulmix.sbp"
 
-# open file
-with open(path, "rb") as f:
-    content_bytes = f.read()
 
-outputfile = open("output.bin", "wb")
+def read_manifest(path: str, prefix_size: int = 4096) -> BpManifest:
+    """Read only the uncompressed manifest of a .sbp file.
+
+    Reads a prefix of the file and grows it until the manifest fits, the compressed body is never read.
+    """
+    with open(path, "rb") as f:
+        prefix = f.read(prefix_size)
+
+        while True:
+            reader = BufferReader(prefix)
+
+            try:
+                manifest = BpManifestReader().read(reader)
+                if reader.offset <= len(prefix):
+                    return manifest
+            except (struct.error, UnicodeDecodeError):
+                pass  # ran past the end of the prefix
+
+            more = f.read(len(prefix))
+            if not more:
+                raise Exception(f"Truncated manifest: {path}")
+
+            prefix += more
+
+
+def read_body(decompressed, body_reader: BpBodyReader = None, tracer=None,
+              string_cache: StringCache = None, struct_cache: BpStructCache = None) -> list[BpObject]:
+    """Decode the objects of a decompressed body."""
+    reader = BufferReader(decompressed, zero_copy=True, tracer=tracer, string_cache=string_cache,
+                          struct_cache=struct_cache)
+
+    actual_body_size = reader.next_int32()
+    # check if no data is out of bounds
+    assert actual_body_size <= len(decompressed), f"Invalid body size: {actual_body_size} != {len(decompressed)}"
+
+    unknown_field = reader.next_int32()
+
+    return (body_reader or BpBodyReader()).read(reader)
+
 
+def parse_content(content_reader: BufferReader, lazy: bool = False,
+                  decompress_workers: int | None = None, tracer=None,
+                  struct_cache: BpStructCache = None) -> BpBlueprint:
+    """Header -> decompress -> body, for the contents of a .sbp file.
 
-content_reader = BufferReader(content_bytes)
+    :param struct_cache: Share identical struct properties between objects, see BpStructCache.
+    """
+    manifest = BpManifestReader().read(content_reader)
 
-# Header
-metadata = (content_reader.next_int32(), content_reader.next_int32(), content_reader.next_int32())
-print(f"Metadata: {metadata}")
+    start = time.perf_counter()
+    decompressed = decompress_body(content_reader, decompress_workers)
 
-dimensions = (content_reader.next_int32() * 8, content_reader.next_int32() * 8, content_reader.next_int32() * 8)
-print(f"Size: {dimensions[0]}m x {dimensions[1]}m x {dimensions[2]}m")
+    if tracer is not None:
+        tracer.phase("decompress", time.perf_counter() - start)
 
+    objects = read_body(decompressed, BpBodyReader(lazy=lazy), tracer=tracer, string_cache=StringCache(),
+                        struct_cache=struct_cache)
+    return BpBlueprint(manifest, objects)
 
-# 1. materials
-amount = content_reader.next_int32()
-content_reader.skip_forward(4)  # skip 4 null bytes
 
-print("Materials ============================================================================")
+def parse_blueprint(path: str, lazy: bool = False, decompress_workers: int | None = None,
+                    tracer=None, struct_cache: BpStructCache = None) -> BpBlueprint:
+    """Header -> decompress -> body, for one .sbp file."""
+    # memory-mapped, nothing is copied until the chunks are inflated
+    with BufferReader.from_file(path) as content_reader:
+        return parse_content(content_reader, lazy, decompress_workers, tracer, struct_cache)
 
-for i in range(amount):
-    mat_id = content_reader.next_string()
 
-    # read amount: 4 bytes
-    amount = content_reader.next_int32()
+def write_body(objects: list[BpObject], body_reader: BpBodyReader = None) -> memoryview:
+    """Encode objects into a decompressed body, the inverse of read_body."""
+    writer = BufferWriter()
 
-    print(f"\t{amount} x {mat_id}")
+    writer.push_length()  # body size
+    writer.push_length()  # unknown_field, written as the header table length
 
-    # skip 4 null bytes
-    content_reader.skip_forward(4)
+    body_reader = body_reader or BpBodyReader()
+    body_reader.write_headers(objects, writer)
+    writer.pop_length()
 
-# revert last offset change
-content_reader.skip_backwards(4)
+    body_reader.write_entities(objects, writer)
+    writer.pop_length()
 
-print("\nBuilding Types =======================================================================")
+    return writer.getbuffer()
 
-# 2. Buildings
-amount = content_reader.next_int32()
-content_reader.skip_forward(4)  # skip 4 null bytes
 
-for i in range(amount):
-    building_id = content_reader.next_string()
+def encode_blueprint(blueprint: BpBlueprint, compress_workers: int | None = None) -> bytes:
+    """Encode a blueprint into the contents of a .sbp file."""
+    writer = BufferWriter()
+    BpManifestReader().write(blueprint.manifest, writer)
 
-    print(f"\t{building_id}")
+    return b"".join([writer.getbuffer(), compress_body(write_body(blueprint.objects), compress_workers)])
 
-    # skip 4 null bytes
-    content_reader.skip_forward(4)
 
+def write_blueprint(path: str, blueprint: BpBlueprint, compress_workers: int | None = None):
+    with open(path, "wb") as f:
+        f.write(encode_blueprint(blueprint, compress_workers))
 
-# revert last offset change
-content_reader.skip_backwards(4)
 
-# 3. Building data (Compressed)
-# For now, assuming compression with zlib.
+def main():
+    outputfile = open("output.bin", "wb")
 
-signature = content_reader.next_int32()
-assert signature == -1641380927, f"Invalid signature: {signature}"
+    # memory-mapped, nothing is copied until the chunks are inflated
+    content_reader = BufferReader.from_file(path)
 
-archive_header = content_reader.next_int32()
-assert archive_header == 0x22222222, f"Invalid archive header: {archive_header}"
+    # Header
+    manifest = BpManifestReader().read(content_reader)
+    print(f"Metadata: {manifest.metadata}")
 
-max_chunk_size = content_reader.next_int64()
-assert max_chunk_size == 128 * 1024, f"Invalid max chunk size: {max_chunk_size}"
+    dimensions = manifest.dimensions
+    print(f"Size: {dimensions[0]}m x {dimensions[1]}m x {dimensions[2]}m")
 
-algorithm = content_reader.next_byte()
-assert algorithm == 3, f"Invalid algorithm: {algorithm}"  # assume always zlib
+    # 1. materials
+    print("Materials ============================================================================")
 
-compressed_size = content_reader.next_int64()
+    for material in manifest.materials:
+        print(f"\t{material.amount} x {material.item}")
 
-decompressed_size = content_reader.next_int64()
+    # 2. Buildings
+    print("\nBuilding Types =======================================================================")
 
-assert compressed_size == content_reader.next_int64(), "Compressed size mismatch"
-assert decompressed_size == content_reader.next_int64(), "Decompressed size mismatch"
+    for building_id in manifest.building_types:
+        print(f"\t{building_id}")
 
+    # 3. Building data (Compressed)
+    # A chain of zlib chunks, each with its own header, inflated in parallel.
 
-# decompress
-compressed_data = content_reader.next_bytes(compressed_size)
-decompressed = zlib.decompress(compressed_data)
-# output to file
-outputfile.write(decompressed)
+    decompressed = decompress_body(content_reader)
+    source_hash = hash_source(content_reader.buffer)
+    content_reader.close()
+    # output to file
+    outputfile.write(decompressed)
 
-# someone complained.
-outputfile.close()
+    # someone complained.
+    outputfile.close()
 
+    # random-access index of the entities, next to output.bin
+    index_reader = BufferReader(decompressed, zero_copy=True)
+    index_reader.skip_forward(8)  # body size, unknown field
+    BpEntityIndex.build(index_reader, source_hash).write(index_path_for("output.bin"))
 
-# let's use the decompressed data
-body_reader = BufferReader(decompressed)
+    # let's use the decompressed data
+    # set to tracing.PrintTracer() to trace the offset of every property when debugging a bad file,
+    # or to ProfilingTracer() to see where the parse time goes
+    tracer = None
+    string_cache = StringCache()
 
-actual_body_size = body_reader.next_int32()
-# check if no data is out of bounds
-assert actual_body_size <= len(decompressed), f"Invalid body size: {actual_body_size} != {len(decompressed)}"
+    print("\nBody Data ============================================================================")
 
-unknown_field = body_reader.next_int32()
+    # read objects
+    objects = read_body(decompressed, tracer=tracer, string_cache=string_cache)
+    print(f"Object count: {len(objects)}")
+    print(f"Strings: {string_cache}")
 
-print("\nBody Data ============================================================================")
+    if isinstance(tracer, ProfilingTracer):
+        print(tracer.report())
 
-# read objects
-objects = BpBodyReader().read(body_reader)
+    # dump to json, one object per line
+    write_ndjson(objects, sys.stdout)
 
 
-# dump to json
-for obj in objects:
-    print(obj.dump_to_json())
+if __name__ == "__main__":
+    main()
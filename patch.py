@@ -0,0 +1,229 @@
+import bisect
+import struct
+import zlib
+
+from BufferReader import BufferReader
+from BufferWriter import BufferWriter
+from compression import CHUNK_HEADER, compress_body, decompress_chunks, read_chunk_headers, _compress_chunk
+from index import BpEntityIndex, hash_source
+from reader import BpHeaderReader, BpManifestReader, PROPERTY_CODECS, PROPERTY_READER, TYPED_STRUCTS
+from structure import BpObject, BpProperty
+
+_INT32 = struct.Struct("<i")
+
+# the body starts with its size and an unknown field, the object count follows
+BODY_SIZE_OFFSET = 0
+OBJECT_COUNT_OFFSET = 8
+
+
+class BpBlueprintPatcher:
+    """Edits single properties of a .sbp file in place.
+
+    The new value is encoded on its own and spliced into the decompressed body. Only the length prefixes that
+    enclose it are fixed up (enclosing structs, the entity, the entity data and the body), and when encoding only the
+    128 KiB chunks that changed are compressed again, the others are copied as they are.
+
+    If an edit changes the length of the body, everything after it moves and all chunks from there on are compressed
+    again. Fixed-size edits (floats, ints, colors, vectors, same-length paths) only touch one or two chunks.
+    """
+
+    def __init__(self, content: bytes):
+        self.content = content
+
+        content_reader = BufferReader(content, zero_copy=True)
+        BpManifestReader().read(content_reader)
+        self.manifest_size = content_reader.offset
+
+        self.chunks = read_chunk_headers(content_reader)
+        if not self.chunks:
+            raise Exception("No compressed chunks found")
+
+        self.body = bytearray(decompress_chunks(content, self.chunks))
+
+        # decompressed start of every original chunk
+        self.chunk_starts = []
+        start = 0
+        for chunk in self.chunks:
+            self.chunk_starts.append(start)
+            start += chunk.decompressed_size
+
+        index_reader = BufferReader(self.body, zero_copy=True)
+        index_reader.set_offset(OBJECT_COUNT_OFFSET)
+        self.index = BpEntityIndex.build(index_reader, hash_source(content))
+
+        self._numbers = None
+
+        # original chunks that have to be compressed again
+        self.dirty_chunks = set()
+
+        # body offset of the first edit that changed the length, everything after it is compressed again
+        self.shifted_from = None
+
+    @classmethod
+    def from_file(cls, path: str) -> "BpBlueprintPatcher":
+        with open(path, "rb") as f:
+            return cls(f.read())
+
+    def number_of(self, instance_name: str) -> int:
+        """Entity number of an object by its instance name."""
+        if self._numbers is None:
+            header_reader = BpHeaderReader()
+            reader = BufferReader(self.body, zero_copy=True)
+            self._numbers = {}
+
+            for number, entry in enumerate(self.index.entries):
+                reader.set_offset(entry.header_offset)
+                self._numbers[header_reader.read(reader).instance_name] = number
+
+        if instance_name not in self._numbers:
+            raise Exception(f"Unknown object: {instance_name}")
+
+        return self._numbers[instance_name]
+
+    def _touch(self, start: int, end: int):
+        """Mark the original chunks that overlap a range of the body as dirty."""
+        if self.shifted_from is not None:
+            end = min(end, self.shifted_from)
+
+        if start >= end:
+            return  # moved anyway
+
+        first = bisect.bisect_right(self.chunk_starts, start) - 1
+        last = bisect.bisect_right(self.chunk_starts, end - 1) - 1
+        self.dirty_chunks.update(range(first, last + 1))
+
+    def _add_int32(self, offset: int, delta: int):
+        _INT32.pack_into(self.body, offset, _INT32.unpack_from(self.body, offset)[0] + delta)
+        self._touch(offset, offset + 4)
+
+    def _locate(self, number: int, names: list[str]) -> tuple[int, int, list[int]]:
+        """Find a property of an entity by its name and the names of the structs around it.
+
+        :return: Start and end of the property in the body, and the offsets of the size fields of the enclosing
+            structs.
+        """
+        entry = self.index.entries[number]
+        reader = BufferReader(self.body, zero_copy=True)
+
+        reader.set_offset(entry.header_offset)
+        type_flag = reader.next_int32()
+
+        reader.set_offset(entry.offset + 4)
+
+        if type_flag == 1:
+            reader.next_string()  # parent_root
+            reader.next_string()  # parent_object_name
+
+            for i in range(reader.next_int32()):
+                reader.next_string()
+                reader.next_string()
+
+        size_offsets = []
+
+        for depth, name in enumerate(names):
+            while True:
+                start = reader.offset
+                prop_name = reader.next_string()
+
+                if prop_name == "None":
+                    raise Exception(f"Property not found in object {number}: {'.'.join(names)}")
+
+                prop_type = reader.next_string()
+
+                codec = PROPERTY_CODECS.get(prop_type)
+                if codec is None:
+                    raise Exception(f"Unknown property type: {prop_type} at offset 0x{start:02X}")
+
+                if prop_name != name or depth == len(names) - 1:
+                    codec.read(reader, prop_name, prop_type)
+
+                    if prop_name == name:
+                        return start, reader.offset, size_offsets
+
+                    continue
+
+                if prop_type != "StructProperty":
+                    raise Exception(f"Not a struct: {prop_name} ({prop_type})")
+
+                size_offsets.append(reader.offset)
+
+                reader.skip_forward(4 + 4)  # size, 4 null bytes
+                struct_type = reader.next_string()
+                reader.skip_forward(8 + 8 + 1)
+
+                if struct_type in TYPED_STRUCTS or struct_type == "Guid":
+                    raise Exception(f"Typed struct has no properties: {prop_name} ({struct_type})")
+
+                break
+
+    def set_property(self, target: int | BpObject, prop: BpProperty, parents: tuple[str, ...] = ()):
+        """Replace a property of an object.
+
+        :param target: Entity number, or a decoded object of this blueprint.
+        :param prop: The new property, it replaces the property with the same name.
+        :param parents: Names of the structs the property is nested in, outermost first.
+        """
+        number = self.number_of(target.header.instance_name) if isinstance(target, BpObject) else target
+        start, end, size_offsets = self._locate(number, [*parents, prop.name])
+
+        writer = BufferWriter()
+        PROPERTY_READER.write(prop, writer)
+        encoded = writer.getbuffer()
+
+        delta = len(encoded) - (end - start)
+
+        if delta == 0 and self.body[start:end] == encoded:
+            return
+
+        self.body[start:end] = encoded
+
+        if delta != 0:
+            self.shifted_from = start if self.shifted_from is None else min(self.shifted_from, start)
+
+            entry = self.index.entries[number]
+
+            for offset in size_offsets:
+                self._add_int32(offset, delta)
+
+            self._add_int32(entry.offset, delta)
+            self._add_int32(self.index.entity_data_offset, delta)
+            self._add_int32(BODY_SIZE_OFFSET, delta)
+
+            entry.size += delta
+            for later in self.index.entries[number + 1:]:
+                later.offset += delta
+
+        self._touch(start, start + len(encoded))
+
+    def encode(self, compress_workers: int | None = None, level: int = zlib.Z_DEFAULT_COMPRESSION) -> bytes:
+        """Contents of the patched .sbp file."""
+        data = memoryview(self.content)
+        parts = [data[:self.manifest_size]]
+
+        tail_start = len(self.body)
+        if self.shifted_from is not None:
+            tail_start = self.chunk_starts[bisect.bisect_right(self.chunk_starts, self.shifted_from) - 1]
+
+        body = memoryview(self.body)
+
+        for i, chunk in enumerate(self.chunks):
+            start = self.chunk_starts[i]
+
+            if start >= tail_start:
+                break
+
+            if i in self.dirty_chunks:
+                parts.append(_compress_chunk(body[start:start + chunk.decompressed_size], level))
+            else:
+                parts.append(data[chunk.data_offset - CHUNK_HEADER.size:chunk.data_offset + chunk.compressed_size])
+
+        if tail_start < len(self.body):
+            parts.append(compress_body(body[tail_start:], compress_workers, level))
+
+        return b"".join(parts)
+
+    def write(self, path: str, compress_workers: int | None = None):
+        content = self.encode(compress_workers)
+
+        with open(path, "wb") as f:
+            f.write(content)
@@ -1,8 +1,40 @@
+import struct
+import sys
+import time
+from array import array
+from collections import OrderedDict
+
 from BufferReader import BufferReader
 from BufferWriter import BufferWriter
-from structure import BpHeader, BpObject, BpProperty, BpObjectProperty, BpStructProperty, TypedData, BpByteProperty, \
+from structure import BpHeader, BpObject, BpProperty, BpObjectProperty, BpStructProperty, BpByteProperty, \
     BpActorHeader, BpComponentHeader, BpObjectReference, BpFloatProperty, BpIntProperty, BpInt64Property, \
-    BpEnumProperty, BpBoolProperty, BpArrayProperty, BpStructArrayProperty, BpValueArrayProperty
+    BpEnumProperty, BpBoolProperty, BpArrayProperty, BpStructArrayProperty, BpValueArrayProperty, BpLazyObject, \
+    BpManifest, BpItemAmount, BpColor, BpLinearColor, BpVector, BpRotator, BpVector2D, BpVector4, BpQuat, BpGuid, \
+    read_only
+
+# need_transform, rotation (x, y, z, w), position (x, y, z), scale (x, y, z), placed_in_level
+ACTOR_TRANSFORM = struct.Struct("<i10fi")
+
+# the BpActorHeader fields of the 10 floats of ACTOR_TRANSFORM, in order
+TRANSFORM_FIELDS = ("rot_x", "rot_y", "rot_z", "rot_w", "pos_x", "pos_y", "pos_z", "scale_x", "scale_y", "scale_z")
+
+# struct_type -> (layout, value type) of the fixed-size typed structs
+TYPED_STRUCTS = {
+    "Color": (struct.Struct("<4B"), BpColor),
+    "LinearColor": (struct.Struct("<4f"), BpLinearColor),
+    "Vector": (struct.Struct("<3f"), BpVector),
+    "Rotator": (struct.Struct("<3f"), BpRotator),
+    "Vector2D": (struct.Struct("<2f"), BpVector2D),
+    "Vector4": (struct.Struct("<4f"), BpVector4),
+    "Quat": (struct.Struct("<4f"), BpQuat),
+}
+
+# array_type -> typecode of the fixed-width value arrays decoded in bulk
+VALUE_ARRAYS = {
+    "IntProperty": "i",
+    "Int64Property": "q",
+    "FloatProperty": "f",
+}
 
 
 class BpReader:
@@ -21,22 +53,15 @@ class BpHeaderReader(BpReader):
         type_path = reader.next_string()
         root = reader.next_string()
         instance_name = reader.next_string()
-        need_transform = reader.next_int32() == 1
-
-        rot_x = reader.next_float()
-        rot_y = reader.next_float()
-        rot_z = reader.next_float()
-        rot_w = reader.next_float()
-
-        pos_x = reader.next_float()
-        pos_y = reader.next_float()
-        pos_z = reader.next_float()
 
-        scale_x = reader.next_float()
-        scale_y = reader.next_float()
-        scale_z = reader.next_float()
+        (need_transform,
+         rot_x, rot_y, rot_z, rot_w,
+         pos_x, pos_y, pos_z,
+         scale_x, scale_y, scale_z,
+         placed_in_level) = reader.next_struct(ACTOR_TRANSFORM)
 
-        placed_in_level = reader.next_int32() == 1
+        need_transform = need_transform == 1
+        placed_in_level = placed_in_level == 1
 
         return BpActorHeader(1,  # type_flag
                              type_path, root, instance_name, need_transform, rot_x, rot_y, rot_z, rot_w, pos_x, pos_y,
@@ -48,22 +73,12 @@ class BpHeaderReader(BpReader):
         writer.next_string(obj.type_path)
         writer.next_string(obj.root)
         writer.next_string(obj.instance_name)
-        writer.next_int32(1 if obj.need_transform else 0)
-
-        writer.next_float(obj.rot_x)
-        writer.next_float(obj.rot_y)
-        writer.next_float(obj.rot_z)
-        writer.next_float(obj.rot_w)
-
-        writer.next_float(obj.pos_x)
-        writer.next_float(obj.pos_y)
-        writer.next_float(obj.pos_z)
-
-        writer.next_float(obj.scale_x)
-        writer.next_float(obj.scale_y)
-        writer.next_float(obj.scale_z)
-
-        writer.next_int32(1 if obj.placed_in_level else 0)
+        writer.next_struct(ACTOR_TRANSFORM,
+                           1 if obj.need_transform else 0,
+                           obj.rot_x, obj.rot_y, obj.rot_z, obj.rot_w,
+                           obj.pos_x, obj.pos_y, obj.pos_z,
+                           obj.scale_x, obj.scale_y, obj.scale_z,
+                           1 if obj.placed_in_level else 0)
 
     def _read_component_header(self, reader: BufferReader) -> BpComponentHeader:
         type_path = reader.next_string()
@@ -96,10 +111,75 @@ class BpHeaderReader(BpReader):
         if isinstance(obj, BpActorHeader):
             self._write_actor_header(obj, writer)
 
+        elif isinstance(obj, BpComponentHeader):
+            self._write_component_header(obj, writer)
+
         else:
             raise Exception(f"Unknown header implementation: {obj}")
 
 
+class BpManifestReader(BpReader):
+    def read(self, reader: BufferReader) -> BpManifest:
+        metadata = (reader.next_int32(), reader.next_int32(), reader.next_int32())
+        dimensions = (reader.next_int32() * 8, reader.next_int32() * 8, reader.next_int32() * 8)
+
+        # 1. materials
+        materials = []
+
+        amount = reader.next_int32()
+        reader.skip_forward(4)  # skip 4 null bytes
+
+        for i in range(amount):
+            mat_id = reader.next_string()
+
+            # read amount: 4 bytes
+            mat_amount = reader.next_int32()
+
+            materials.append(BpItemAmount(mat_id, mat_amount))
+
+            # skip 4 null bytes
+            reader.skip_forward(4)
+
+        # revert last offset change
+        reader.skip_backwards(4)
+
+        # 2. Buildings
+        building_types = []
+
+        amount = reader.next_int32()
+        reader.skip_forward(4)  # skip 4 null bytes
+
+        for i in range(amount):
+            building_types.append(reader.next_string())
+
+            # skip 4 null bytes
+            reader.skip_forward(4)
+
+        # revert last offset change
+        reader.skip_backwards(4)
+
+        return BpManifest(metadata, dimensions, materials, building_types)
+
+    def write(self, obj: BpManifest, writer: BufferWriter):
+        for value in obj.metadata:
+            writer.next_int32(value)
+
+        for value in obj.dimensions:
+            writer.next_int32(value // 8)
+
+        # each entry is preceded by the 4 null bytes the reader skips
+        writer.next_int32(len(obj.materials))
+        for material in obj.materials:
+            writer.next_bytes(b"\x00" * 4)
+            writer.next_string(material.item)
+            writer.next_int32(material.amount)
+
+        writer.next_int32(len(obj.building_types))
+        for building_id in obj.building_types:
+            writer.next_bytes(b"\x00" * 4)
+            writer.next_string(building_id)
+
+
 class BpObjectReferenceReader(BpReader):
     def read(self, reader: BufferReader) -> BpObjectReference:
         level_name = reader.next_string()
@@ -112,29 +192,35 @@ class BpObjectReferenceReader(BpReader):
         writer.next_string(obj.path_name)
 
 
-class BpPropertyReader(BpReader):
-    def _read_bool_property(self, reader: BufferReader) -> BpBoolProperty:
-        name = reader.next_string()
-        prop_type = reader.next_string()
+class BpPropertyCodec:
+    """Stateless reader and writer of one property type.
+
+    The property name and type are read and written by BpPropertyReader, codecs only handle what follows them.
+    """
+
+    def read(self, reader: BufferReader, name: str, prop_type: str) -> BpProperty:
+        pass
 
+    def write(self, obj: BpProperty, writer: BufferWriter):
+        pass
+
+
+class BpBoolPropertyCodec(BpPropertyCodec):
+    def read(self, reader: BufferReader, name: str, prop_type: str) -> BpBoolProperty:
         reader.skip_forward(8)
         value = reader.next_byte() == 1
         reader.skip_forward(1)
 
         return BpBoolProperty(name, prop_type, value)
 
-    def _write_bool_property(self, obj: BpBoolProperty, writer: BufferWriter):
-        writer.next_string(obj.name)
-        writer.next_string(obj.prop_type)
-
+    def write(self, obj: BpBoolProperty, writer: BufferWriter):
         writer.next_bytes(b"\x00" * 8)
         writer.next_byte(1 if obj.value else 0)
         writer.next_bytes(b"\x00")
 
-    def _read_byte_property(self, reader: BufferReader) -> BpByteProperty:
-        name = reader.next_string()
-        prop_type = reader.next_string()
 
+class BpBytePropertyCodec(BpPropertyCodec):
+    def read(self, reader: BufferReader, name: str, prop_type: str) -> BpByteProperty:
         size = reader.next_int32()
         reader.skip_forward(4)  # skip 4 null bytes
 
@@ -147,33 +233,28 @@ class BpPropertyReader(BpReader):
         else:
             value = reader.next_string()
 
-        reader.print_offset_hex()
-
         return BpByteProperty(name, prop_type, byte_type, value)
 
-    def _write_byte_property(self, obj: BpByteProperty, writer: BufferWriter):
-        writer.next_string(obj.name)
-        writer.next_string(obj.prop_type)
-        set_padding = writer.reserve_write_length_padded()
+    def write(self, obj: BpByteProperty, writer: BufferWriter):
+        writer.push_length()
 
         writer.next_bytes(b"\x00" * 4)
 
         writer.next_string(obj.type)
         writer.next_bytes(b"\x00")
 
-        write_size = set_padding()
+        writer.start_data()
 
         if obj.type == "None":
             writer.next_byte(obj.value)
         else:
             writer.next_string(obj.value)
 
-        write_size()
+        writer.pop_length()
 
-    def _read_object_property(self, reader: BufferReader) -> BpObjectProperty:
-        name = reader.next_string()
-        prop_type = reader.next_string()
 
+class BpObjectPropertyCodec(BpPropertyCodec):
+    def read(self, reader: BufferReader, name: str, prop_type: str) -> BpObjectProperty:
         size = reader.next_int32()
         reader.skip_forward(5)  # skip 5 null bytes
 
@@ -182,24 +263,21 @@ class BpPropertyReader(BpReader):
 
         return BpObjectProperty(name, prop_type, level_name, path_name)
 
-    def _write_object_property(self, obj: BpObjectProperty, writer: BufferWriter):
-        writer.next_string(obj.name)
-        writer.next_string(obj.prop_type)
-        set_padding = writer.reserve_write_length_padded()
+    def write(self, obj: BpObjectProperty, writer: BufferWriter):
+        writer.push_length()
 
         writer.next_bytes(b"\x00" * 5)
 
-        write_size = set_padding()
+        writer.start_data()
 
         writer.next_string(obj.level_name)
         writer.next_string(obj.path_name)
 
-        write_size()
+        writer.pop_length()
 
-    def _read_array_property(self, reader: BufferReader) -> BpArrayProperty:
-        name = reader.next_string()
-        prop_type = reader.next_string()
 
+class BpArrayPropertyCodec(BpPropertyCodec):
+    def read(self, reader: BufferReader, name: str, prop_type: str) -> BpArrayProperty:
         size = reader.next_int32()
 
         reader.skip_forward(4)
@@ -215,42 +293,21 @@ class BpPropertyReader(BpReader):
             raise Exception(f"Unimplemented array type: {array_type}")
 
         elif array_type == "ByteProperty":
-            data = []
             if name == "mFogOfWarRawData":
                 # only save the 3rd byte of each 4 bytes
-                for i in range(array_size / 4):
-                    reader.next_int32()
-                    reader.next_int32()
-                    reader.next_int32()
-                    data.append(reader.next_byte())
+                raw = reader.next_bytes(array_size)
+                data = array("B", raw[2::4])
             else:
-                for i in range(array_size):
-                    data.append(reader.next_byte())
+                data = reader.next_array("B", array_size)
 
             return BpValueArrayProperty(name, prop_type, array_type, data)
 
         elif array_type == "BoolProperty":
-            data = []
-            for i in range(array_size):
-                data.append(reader.next_byte() == 1)
+            data = [value == 1 for value in reader.next_bytes(array_size)]
             return BpValueArrayProperty(name, prop_type, array_type, data)
 
-        elif array_type == "IntProperty":
-            data = []
-            for i in range(array_size):
-                data.append(reader.next_int32())
-            return BpValueArrayProperty(name, prop_type, array_type, data)
-
-        elif array_type == "Int64Property":
-            data = []
-            for i in range(array_size):
-                data.append(reader.next_int64())
-            return BpValueArrayProperty(name, prop_type, array_type, data)
-
-        elif array_type == "FloatProperty":
-            data = []
-            for i in range(array_size):
-                data.append(reader.next_float())
+        elif array_type in VALUE_ARRAYS:
+            data = reader.next_array(VALUE_ARRAYS[array_type], array_size)
             return BpValueArrayProperty(name, prop_type, array_type, data)
 
         elif array_type == "EnumProperty":
@@ -276,72 +333,194 @@ class BpPropertyReader(BpReader):
         else:
             raise Exception(f"Unimplemented array type: {array_type}")
 
-    def _read_struct_property(self, reader: BufferReader) -> BpStructProperty:
-        name = reader.next_string()
-        prop_type = reader.next_string()
+    def write(self, obj: BpArrayProperty, writer: BufferWriter):
+        writer.push_length()
+
+        writer.next_bytes(b"\x00" * 4)
+
+        writer.next_string(obj.array_type)
+        writer.next_bytes(b"\x00")
+
+        writer.start_data()
+
+        if not isinstance(obj, BpValueArrayProperty):
+            raise Exception(f"Unimplemented array type: {obj.array_type}")
+
+        if obj.array_type == "ByteProperty":
+            if obj.name == "mFogOfWarRawData":
+                # the reader only keeps the 3rd byte of each 4 bytes, the others are written as 0
+                raw = bytearray(len(obj.data) * 4)
+                raw[2::4] = bytes(obj.data)
+                writer.next_int32(len(raw))
+                writer.next_bytes(raw)
+            else:
+                writer.next_int32(len(obj.data))
+                writer.next_array(array("B", obj.data))
+
+        elif obj.array_type == "BoolProperty":
+            writer.next_int32(len(obj.data))
+            writer.next_bytes(bytes(1 if value else 0 for value in obj.data))
+
+        elif obj.array_type in VALUE_ARRAYS:
+            writer.next_int32(len(obj.data))
+            writer.next_array(array(VALUE_ARRAYS[obj.array_type], obj.data))
+
+        elif obj.array_type == "EnumProperty" or obj.array_type == "StrProperty":
+            writer.next_int32(len(obj.data))
+            for value in obj.data:
+                writer.next_string(value)
+
+        elif obj.array_type == "ObjectProperty" or obj.array_type == "InterfaceProperty":
+            writer.next_int32(len(obj.data))
+            for value in obj.data:
+                writer.next_string(value["level_name"])
+                writer.next_string(value["path_name"])
+
+        else:
+            raise Exception(f"Unimplemented array type: {obj.array_type}")
+
+        writer.pop_length()
+
+
+def _deep_size(value) -> int:
+    """Approximate memory held by a decoded value. Strings are left out, the StringCache shares them anyway."""
+    if value is None or isinstance(value, (str, bool)):
+        return 0
+
+    size = sys.getsizeof(value)
+
+    if isinstance(value, (list, tuple)):
+        return size + sum(_deep_size(v) for v in value)
+
+    if isinstance(value, dict):
+        return size + sum(_deep_size(v) for v in value.values())
+
+    for cls in type(value).__mro__:
+        for slot in getattr(cls, "__slots__", ()):
+            size += _deep_size(getattr(value, slot, None))
+
+    return size
+
+
+class BpStructCache:
+    """Shares one decoded instance between struct properties with identical bytes.
 
+    Large blueprints repeat the same buildings, so the same color slots, customization data and recipes are encoded
+    over and over. With a cache, each distinct struct property is decoded once, keyed on its name and raw bytes.
+
+    Shared instances are read-only (see structure.read_only), changing them raises. Replace the property in the
+    object's property list instead.
+    """
+
+    def __init__(self, max_entries: int = 8192):
+        """
+        :param max_entries: Number of distinct structs kept, the least recently used ones are dropped first.
+        """
+        self.max_entries = max_entries
+        self.clear()
+
+    @property
+    def size(self) -> int:
+        return len(self._entries)
+
+    @property
+    def saved_bytes(self) -> int:
+        """Memory saved by sharing, minus what the stored keys take. Nested structs have keys of their own."""
+        return self._shared_bytes - self._key_bytes
+
+    @staticmethod
+    def _key_size(key: tuple[str, str, bytes]) -> int:
+        return sys.getsizeof(key) + sys.getsizeof(key[2])
+
+    def get(self, key: tuple[str, str, bytes]) -> BpStructProperty | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+
+        self.hits += 1
+        self._shared_bytes += entry[1]
+        return entry[0]
+
+    def put(self, key: tuple[str, str, bytes], prop: BpStructProperty) -> BpStructProperty:
+        """Store a read-only copy of a property, and return it."""
+        size = _deep_size(prop)  # what every copy would take
+        prop = read_only(prop)
+
+        self._entries[key] = (prop, size)
+        self._key_bytes += self._key_size(key)
+
+        if len(self._entries) > self.max_entries:
+            self._key_bytes -= self._key_size(self._entries.popitem(last=False)[0])
+
+        return prop
+
+    def clear(self):
+        """Drop all entries and reset the statistics."""
+        self._entries: OrderedDict[tuple[str, str, bytes], tuple[BpStructProperty, int]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        self._shared_bytes = 0  # memory the shared instances would have taken as copies
+        self._key_bytes = 0  # memory of the stored keys, each holds a copy of the raw bytes
+
+    def __repr__(self):
+        return (f"BpStructCache(hits={self.hits}, misses={self.misses}, size={self.size}, "
+                f"saved={self.saved_bytes / 1e6:.1f} MB)")
+
+
+class BpStructPropertyCodec(BpPropertyCodec):
+    def read(self, reader: BufferReader, name: str, prop_type: str) -> BpStructProperty:
         size = reader.next_int32()
         reader.skip_forward(4)  # skip 4 null bytes
 
         struct_type = reader.next_string()
-        data = {}
-        is_typed_data = True
 
         # skip padding
         reader.skip_forward(8 + 8 + 1)  # offset is 2 longs, 1 byte
 
-        if struct_type == "Color":
-            data["r"] = reader.next_byte()
-            data["g"] = reader.next_byte()
-            data["b"] = reader.next_byte()
-            data["a"] = reader.next_byte()
-
-        elif struct_type == "LinearColor":
-            data["r"] = reader.next_float()
-            data["g"] = reader.next_float()
-            data["b"] = reader.next_float()
-            data["a"] = reader.next_float()
-
-        elif struct_type == "Vector" or struct_type == "Rotator":
-            data["x"] = reader.next_float()
-            data["y"] = reader.next_float()
-            data["z"] = reader.next_float()
-
-        elif struct_type == "Vector2D":
-            data["x"] = reader.next_float()
-            data["y"] = reader.next_float()
-
-        elif struct_type == "Vector4" or struct_type == "Quat":
-            data["x"] = reader.next_float()
-            data["y"] = reader.next_float()
-            data["z"] = reader.next_float()
-            data["w"] = reader.next_float()
+        struct_cache = reader.struct_cache
+        if struct_cache is None:
+            return self._read_data(reader, name, prop_type, struct_type)
+
+        raw = reader.next_bytes(size)
+        key = (name, struct_type, bytes(raw))
+
+        prop = struct_cache.get(key)
+        if prop is None:
+            # decoded from the key's copy of the bytes, nested properties are not traced
+            data_reader = BufferReader(key[2], string_cache=reader.string_cache, struct_cache=struct_cache)
+            prop = struct_cache.put(key, self._read_data(data_reader, name, prop_type, struct_type))
+
+        return prop
+
+    def _read_data(self, reader: BufferReader, name: str, prop_type: str, struct_type: str) -> BpStructProperty:
+        is_typed_data = True
+
+        if struct_type in TYPED_STRUCTS:
+            layout, value_type = TYPED_STRUCTS[struct_type]
+            data = value_type(*reader.next_struct(layout))
 
         elif struct_type == "Guid":
-            data["guid"] = reader.next_guid()
+            data = BpGuid(reader.next_guid())
 
         else:
-            data["values"] = []
+            data = []
             is_typed_data = False
 
             while True:
-                sub_prop = BpPropertyReader().read(reader)
-                data["values"].append(sub_prop)
+                sub_prop = PROPERTY_READER.read(reader)
+                data.append(sub_prop)
 
                 if sub_prop is None:
                     break
 
-        if is_typed_data:
-            data = TypedData(struct_type, data)
-        else:
-            data = data["values"]
-
         return BpStructProperty(name, prop_type, struct_type, is_typed_data, data)
 
-    def _write_struct_property(self, obj: BpStructProperty, writer: BufferWriter):
-        writer.next_string(obj.name)
-        writer.next_string(obj.prop_type)
-        set_padding = writer.reserve_write_length_padded()
+    def write(self, obj: BpStructProperty, writer: BufferWriter):
+        writer.push_length()
 
         writer.next_bytes(b"\x00" * 4)
 
@@ -349,46 +528,25 @@ class BpPropertyReader(BpReader):
 
         writer.next_bytes(b"\x00" * (8 + 8 + 1))  # padding (2 longs, 1 byte)
 
-        write_size = set_padding()
+        writer.start_data()
 
         if obj.is_typed_data:
-            if obj.struct_type == "Color":
-                writer.next_byte(obj.data["r"])
-                writer.next_byte(obj.data["g"])
-                writer.next_byte(obj.data["b"])
-                writer.next_byte(obj.data["a"])
-
-            elif obj.struct_type == "LinearColor":
-                writer.next_float(obj.data["r"])
-                writer.next_float(obj.data["g"])
-                writer.next_float(obj.data["b"])
-                writer.next_float(obj.data["a"])
-
-            elif obj.struct_type == "Vector" or obj.struct_type == "Rotator":
-                writer.next_float(obj.data["x"])
-                writer.next_float(obj.data["y"])
-                writer.next_float(obj.data["z"])
-
-            elif obj.struct_type == "Vector2D":
-                writer.next_float(obj.data["x"])
-                writer.next_float(obj.data["y"])
-
-            elif obj.struct_type == "Vector4" or obj.struct_type == "Quat":
-                writer.next_float(obj.data["x"])
-                writer.next_float(obj.data["y"])
-                writer.next_float(obj.data["z"])
-                writer.next_float(obj.data["w"])
+            if obj.struct_type in TYPED_STRUCTS:
+                layout, value_type = TYPED_STRUCTS[obj.struct_type]
+                writer.next_struct(layout, *obj.data.astuple())
+
+            elif obj.struct_type == "Guid":
+                writer.next_guid(obj.data.guid)
 
         else:
             for sub_prop in obj.data:
-                BpPropertyReader().write(sub_prop, writer)
+                PROPERTY_READER.write(sub_prop, writer)
 
-        write_size()
+        writer.pop_length()
 
-    def _read_enum_property(self, reader: BufferReader) -> BpEnumProperty:
-        name = reader.next_string()
-        prop_type = reader.next_string()
 
+class BpEnumPropertyCodec(BpPropertyCodec):
+    def read(self, reader: BufferReader, name: str, prop_type: str) -> BpEnumProperty:
         size = reader.next_int32()
         reader.skip_forward(4)
 
@@ -400,26 +558,23 @@ class BpPropertyReader(BpReader):
 
         return BpEnumProperty(name, prop_type, enum_type, value)
 
-    def _write_enum_property(self, obj: BpEnumProperty, writer: BufferWriter):
-        writer.next_string(obj.name)
-        writer.next_string(obj.prop_type)
-        set_padding = writer.reserve_write_length_padded()
+    def write(self, obj: BpEnumProperty, writer: BufferWriter):
+        writer.push_length()
 
         writer.next_bytes(b"\x00" * 4)
 
         writer.next_string(obj.enum_type)
         writer.next_bytes(b"\x00")
 
-        write_size = set_padding()
+        writer.start_data()
 
         writer.next_string(obj.value)
 
-        write_size()
+        writer.pop_length()
 
-    def _read_float_property(self, reader: BufferReader) -> BpFloatProperty:
-        name = reader.next_string()
-        prop_type = reader.next_string()
 
+class BpFloatPropertyCodec(BpPropertyCodec):
+    def read(self, reader: BufferReader, name: str, prop_type: str) -> BpFloatProperty:
         size = reader.next_int32()
 
         assert size == 4, f"Unimplemented float property size: {size}"
@@ -430,19 +585,16 @@ class BpPropertyReader(BpReader):
 
         return BpFloatProperty(name, prop_type, value)
 
-    def _write_float_property(self, obj: BpFloatProperty, writer: BufferWriter):
-        writer.next_string(obj.name)
-        writer.next_string(obj.prop_type)
+    def write(self, obj: BpFloatProperty, writer: BufferWriter):
         writer.next_int32(4)
 
         writer.next_bytes(b"\x00" * 5)
 
         writer.next_float(obj.value)
 
-    def _read_int_property(self, reader: BufferReader) -> BpIntProperty:
-        name = reader.next_string()
-        prop_type = reader.next_string()
 
+class BpIntPropertyCodec(BpPropertyCodec):
+    def read(self, reader: BufferReader, name: str, prop_type: str) -> BpIntProperty:
         size = reader.next_int32()
 
         assert size == 4, f"Unimplemented int property size: {size}"
@@ -453,19 +605,16 @@ class BpPropertyReader(BpReader):
 
         return BpIntProperty(name, prop_type, value)
 
-    def _write_int_property(self, obj: BpIntProperty, writer: BufferWriter):
-        writer.next_string(obj.name)
-        writer.next_string(obj.prop_type)
+    def write(self, obj: BpIntProperty, writer: BufferWriter):
         writer.next_int32(4)
 
         writer.next_bytes(b"\x00" * 5)
 
         writer.next_int32(obj.value)
 
-    def _read_int_64_property(self, reader: BufferReader) -> BpInt64Property:
-        name = reader.next_string()
-        prop_type = reader.next_string()
 
+class BpInt64PropertyCodec(BpPropertyCodec):
+    def read(self, reader: BufferReader, name: str, prop_type: str) -> BpInt64Property:
         size = reader.next_int32()
 
         assert size == 8, f"Unimplemented int64 property size: {size}"
@@ -476,18 +625,41 @@ class BpPropertyReader(BpReader):
 
         return BpInt64Property(name, prop_type, value)
 
-    def _write_int_64_property(self, obj: BpInt64Property, writer: BufferWriter):
-        writer.next_string(obj.name)
-        writer.next_string(obj.prop_type)
+    def write(self, obj: BpInt64Property, writer: BufferWriter):
         writer.next_int32(8)
 
         writer.next_bytes(b"\x00" * 5)
         writer.next_int64(obj.value)
 
+
+# prop_type -> codec, see register_property_codec
+PROPERTY_CODECS: dict[str, BpPropertyCodec] = {}
+
+
+def register_property_codec(prop_type: str, codec: BpPropertyCodec):
+    """Register the codec used to read and write properties of a type. Replaces any existing codec."""
+    PROPERTY_CODECS[prop_type] = codec
+
+
+register_property_codec("BoolProperty", BpBoolPropertyCodec())
+register_property_codec("ByteProperty", BpBytePropertyCodec())
+register_property_codec("ObjectProperty", BpObjectPropertyCodec())
+register_property_codec("ArrayProperty", BpArrayPropertyCodec())
+register_property_codec("StructProperty", BpStructPropertyCodec())
+register_property_codec("EnumProperty", BpEnumPropertyCodec())
+register_property_codec("FloatProperty", BpFloatPropertyCodec())
+register_property_codec("IntProperty", BpIntPropertyCodec())
+register_property_codec("Int64Property", BpInt64PropertyCodec())
+
+
+class BpPropertyReader(BpReader):
     def read(self, reader: BufferReader) -> BpProperty or None:
-        jump_back = reader.set_jump_point()
+        tracer = reader.tracer
+        if tracer is not None:
+            start = time.perf_counter()
+            position = reader.position
 
-        print(f"Reading property at offset 0x{reader.offset:02X}")
+        offset = reader.offset
         name = reader.next_string()
 
         if name == "None":
@@ -495,43 +667,44 @@ class BpPropertyReader(BpReader):
 
         prop_type = reader.next_string()
 
-        print(f"Reading property {name} ({prop_type})")
-
-        jump_back()  # property readers will read the name and type again for completeness
-
-        if prop_type == "StructProperty":
-            return self._read_struct_property(reader)
+        codec = PROPERTY_CODECS.get(prop_type)
+        if codec is None:
+            raise Exception(f"Unknown property type: {prop_type} at offset 0x{offset:02X}")
 
-        if prop_type == "ArrayProperty":
-            return self._read_array_property(reader)
+        prop = codec.read(reader, name, prop_type)
 
-        if prop_type == "ObjectProperty":
-            return self._read_object_property(reader)
+        if tracer is not None:
+            tracer.property(position, name, prop_type, reader.position - position, time.perf_counter() - start,
+                            prop.struct_type if isinstance(prop, BpStructProperty) else None)
 
-        if prop_type == "ByteProperty":
-            return self._read_byte_property(reader)
-
-        if prop_type == "FloatProperty":
-            return self._read_float_property(reader)
-
-        reader.print_offset_hex()
-        raise Exception(f"Unknown property type: {prop_type}")
+        return prop
 
     def write(self, obj: BpProperty or None, writer: BufferWriter):
         if obj is None:
             writer.next_string("None")
             return
 
-        if isinstance(obj, BpObjectProperty):
-            self._write_object_property(obj, writer)
+        codec = PROPERTY_CODECS.get(obj.prop_type)
+        if codec is None:
+            raise Exception(f"Unknown property type: {obj.prop_type}")
+
+        writer.next_string(obj.name)
+        writer.next_string(obj.prop_type)
+        codec.write(obj, writer)
+
+
+PROPERTY_READER = BpPropertyReader()
 
 
 class BpPropertiesReader(BpReader):
     def read(self, reader: BufferReader) -> list[BpProperty or None]:
         properties = []
 
+        if reader.tracer is not None:
+            reader.tracer.properties_start(reader.position)
+
         while True:
-            prop = BpPropertyReader().read(reader)
+            prop = PROPERTY_READER.read(reader)
             if prop is None:
                 properties.append(None)
                 break
@@ -540,54 +713,127 @@ class BpPropertiesReader(BpReader):
 
         return properties
 
-    def write(self, obj: list[BpProperty], writer: BufferWriter):
-        pass
+    def write(self, obj: list[BpProperty or None], writer: BufferWriter):
+        for prop in obj:
+            PROPERTY_READER.write(prop, writer)
+
+        if not obj or obj[-1] is not None:
+            PROPERTY_READER.write(None, writer)
 
 
 class BpBodyReader(BpReader):
+    def __init__(self, lazy: bool = False):
+        """
+        :param lazy: Only decode the headers up front. The properties of each object are decoded the first time
+            they are accessed, using the entity's size prefix to skip over them.
+        """
+        super().__init__()
+        self.lazy = lazy
+
+        self.header_reader = BpHeaderReader()
+        self.reference_reader = BpObjectReferenceReader()
+        self.properties_reader = BpPropertiesReader()
+
+    def read_entity(self, reader: BufferReader, index: int, header: BpHeader) -> BpObject:
+        """Read one entity, starting at its size prefix."""
+        if reader.tracer is not None:
+            reader.tracer.entity(index, header, reader.position, reader.next_int32())
+            reader.skip_backwards(4)
+
+        size = reader.next_int32()
+        offset = reader.offset
+
+        parent_root = ""
+        parent_object_name = ""
+        references = []
+
+        if header.type_flag == 1:
+            parent_root = reader.next_string()
+            parent_object_name = reader.next_string()
+
+            reference_count = reader.next_int32()
+
+            for j in range(reference_count):
+                references.append(self.reference_reader.read(reader))
+
+        if self.lazy:
+            lazy_reader = BufferReader(reader.buffer, tracer=reader.tracer, string_cache=reader.string_cache,
+                                       struct_cache=reader.struct_cache)
+            lazy_reader.set_offset(reader.offset)
+            reader.set_offset(offset + size)
+
+            return BpLazyObject(header, parent_root, parent_object_name, references,
+                                lambda: self.properties_reader.read(lazy_reader), offset, size)
+
+        properties = self.properties_reader.read(reader)
+        uk3 = reader.next_int32()
+
+        return BpObject(header, parent_root, parent_object_name, references, properties)
+
     def read(self, reader: BufferReader) -> list[BpObject]:
+        tracer = reader.tracer
+        if tracer is not None:
+            start = time.perf_counter()
+
         objects = []
 
         object_count = reader.next_int32()
-        print(f"Object count: {object_count}")
 
         for i in range(object_count):
-            header = BpHeaderReader().read(reader)
+            header = self.header_reader.read(reader)
             obj = BpObject(header, "", "", [], [])
             objects.append(obj)
 
-        uk1 = reader.next_int32()  # probably the total property data length?
+        if tracer is not None:
+            tracer.phase("headers", time.perf_counter() - start)
+            start = time.perf_counter()
 
-        print(f"UK1: {uk1} (Property Data Length?)")
+        uk1 = reader.next_int32()  # probably the total property data length?
 
         entity_count = reader.next_int32()
 
         for i in range(entity_count):
-            obj = objects[i]
+            objects[i] = self.read_entity(reader, i, objects[i].header)
+
+        if tracer is not None:
+            tracer.phase("entities", time.perf_counter() - start)
 
-            print(
-                f"Reading object {i + 1}/{entity_count} (type: {"Actor" if obj.header.type_flag == 1 else "Component"})")
-            reader.print_offset_hex()
+        return objects
 
-            size = reader.next_int32()
-            print(f"Size: {size}")
+    def write_entity(self, obj: BpObject, writer: BufferWriter):
+        """Write one entity, starting with its size prefix."""
+        writer.push_length()
 
-            if obj.header.type_flag == 1:
-                obj.parent_root = reader.next_string()
-                obj.parent_object_name = reader.next_string()
+        if obj.header.type_flag == 1:
+            writer.next_string(obj.parent_root)
+            writer.next_string(obj.parent_object_name)
 
-                reference_count = reader.next_int32()
+            writer.next_int32(len(obj.references))
 
-                for j in range(reference_count):
-                    obj.references = BpObjectReferenceReader().read(reader)
+            for reference in obj.references:
+                self.reference_reader.write(reference, writer)
 
-            obj.properties = BpPropertiesReader().read(reader)
-            uk3 = reader.next_int32()
-            print(f"UK3: {uk3}")
+        self.properties_reader.write(obj.properties, writer)
+        writer.next_int32(0)  # uk3
 
-            objects[i] = obj
+        writer.pop_length()
 
-        return objects
+    def write_headers(self, obj: list[BpObject], writer: BufferWriter):
+        writer.next_int32(len(obj))
+
+        for o in obj:
+            self.header_reader.write(o.header, writer)
+
+    def write_entities(self, obj: list[BpObject], writer: BufferWriter):
+        writer.push_length()  # uk1, written as the length of the entity data
+
+        writer.next_int32(len(obj))
+
+        for o in obj:
+            self.write_entity(o, writer)
+
+        writer.pop_length()
 
     def write(self, obj: list[BpObject], writer: BufferWriter):
-        pass
+        self.write_headers(obj, writer)
+        self.write_entities(obj, writer)
@@ -0,0 +1,162 @@
+import heapq
+import math
+from array import array
+
+from structure import BpActorHeader, BpObject
+
+try:
+    import numpy as np
+except ImportError:  # optional, only speeds up building the grid
+    np = None
+
+# one foundation, in the engine's units (cm)
+DEFAULT_CELL_SIZE = 800.0
+
+
+class BpSpatialIndex:
+    """Uniform grid over the positions of the actors of a blueprint.
+
+    Supports box, radius and nearest-neighbour queries without scanning all objects. Components have no transform
+    and are not indexed.
+    """
+
+    def __init__(self, objects: list[BpObject], cell_size: float = DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self.objects = [obj for obj in objects if isinstance(obj.header, BpActorHeader)]
+
+        # positions are kept in flat columns, the grid stores indices into them
+        headers = [obj.header for obj in self.objects]
+        self.x = array("d", [header.pos_x for header in headers])
+        self.y = array("d", [header.pos_y for header in headers])
+        self.z = array("d", [header.pos_z for header in headers])
+
+        if np is not None:
+            self.cells = self._build_cells_numpy()
+        else:
+            self.cells = self._build_cells()
+
+        # bounds of the occupied cells on each axis, rings never need to reach past them
+        self.lower = tuple(min((key[axis] for key in self.cells), default=0) for axis in range(3))
+        self.upper = tuple(max((key[axis] for key in self.cells), default=0) for axis in range(3))
+
+    def __len__(self):
+        return len(self.objects)
+
+    def _cell(self, x: float, y: float, z: float) -> tuple[int, int, int]:
+        # the grid is built with the same expression (vectorized if numpy is there), so both agree on the boundaries
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size), math.floor(z / self.cell_size))
+
+    def _build_cells(self) -> dict[tuple[int, int, int], list[int]]:
+        cells = {}
+
+        for i, key in enumerate(map(self._cell, self.x, self.y, self.z)):
+            cell = cells.get(key)
+            if cell is None:
+                cells[key] = [i]
+            else:
+                cell.append(i)
+
+        return cells
+
+    def _build_cells_numpy(self) -> dict[tuple[int, int, int], list[int]]:
+        if not self.objects:
+            return {}
+
+        positions = np.stack([np.frombuffer(self.x), np.frombuffer(self.y), np.frombuffer(self.z)], axis=1)
+        keys = np.floor(positions / self.cell_size).astype(np.int64)
+
+        # group the actors by cell: sort by cell, then split wherever the cell changes
+        unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        order = np.argsort(inverse, kind="stable")
+        splits = np.flatnonzero(np.diff(inverse[order])) + 1
+
+        return {tuple(key): indices.tolist()
+                for key, indices in zip(unique_keys.tolist(), np.split(order, splits))}
+
+    def _candidates(self, lower: tuple[int, int, int], upper: tuple[int, int, int]):
+        """Indices in all cells between two cell keys (inclusive)."""
+        cell_count = (upper[0] - lower[0] + 1) * (upper[1] - lower[1] + 1) * (upper[2] - lower[2] + 1)
+
+        if cell_count > len(self.cells):
+            # a huge query box, walking the occupied cells is cheaper than walking the box
+            for key, cell in self.cells.items():
+                if all(lower[axis] <= key[axis] <= upper[axis] for axis in range(3)):
+                    yield from cell
+            return
+
+        for cx in range(lower[0], upper[0] + 1):
+            for cy in range(lower[1], upper[1] + 1):
+                for cz in range(lower[2], upper[2] + 1):
+                    cell = self.cells.get((cx, cy, cz))
+                    if cell is not None:
+                        yield from cell
+
+    def query_box(self, minimum: tuple[float, float, float], maximum: tuple[float, float, float]) -> list[BpObject]:
+        """All actors with minimum <= position <= maximum on every axis."""
+        x, y, z = self.x, self.y, self.z
+
+        return [self.objects[i] for i in self._candidates(self._cell(*minimum), self._cell(*maximum))
+                if minimum[0] <= x[i] <= maximum[0]
+                and minimum[1] <= y[i] <= maximum[1]
+                and minimum[2] <= z[i] <= maximum[2]]
+
+    def query_radius(self, center: tuple[float, float, float], radius: float) -> list[BpObject]:
+        """All actors within `radius` of a point."""
+        cx, cy, cz = center
+        x, y, z = self.x, self.y, self.z
+        radius_squared = radius * radius
+
+        lower = self._cell(cx - radius, cy - radius, cz - radius)
+        upper = self._cell(cx + radius, cy + radius, cz + radius)
+
+        return [self.objects[i] for i in self._candidates(lower, upper)
+                if (x[i] - cx) ** 2 + (y[i] - cy) ** 2 + (z[i] - cz) ** 2 <= radius_squared]
+
+    def nearest(self, point: tuple[float, float, float], k: int = 1) -> list[tuple[float, BpObject]]:
+        """The `k` actors closest to a point, as (distance, object) pairs sorted by distance."""
+        if not self.objects:
+            return []
+
+        px, py, pz = point
+        x, y, z = self.x, self.y, self.z
+        center = self._cell(px, py, pz)
+
+        # rings never need to reach past the occupied cells
+        max_ring = max(max(center[axis] - self.lower[axis], self.upper[axis] - center[axis]) for axis in range(3))
+
+        best = []  # max-heap of (-distance squared, index)
+
+        def visit(cell: list[int]):
+            for i in cell:
+                distance_squared = (x[i] - px) ** 2 + (y[i] - py) ** 2 + (z[i] - pz) ** 2
+
+                if len(best) < k:
+                    heapq.heappush(best, (-distance_squared, i))
+                elif distance_squared < -best[0][0]:
+                    heapq.heapreplace(best, (-distance_squared, i))
+
+        for ring in range(max_ring + 1):
+            if (2 * ring + 1) ** 3 > len(self.cells):
+                # the rings got bigger than the occupied grid, visit the remaining cells directly
+                for key, cell in self.cells.items():
+                    if max(abs(key[axis] - center[axis]) for axis in range(3)) >= ring:
+                        visit(cell)
+                break
+
+            for cx in range(center[0] - ring, center[0] + ring + 1):
+                for cy in range(center[1] - ring, center[1] + ring + 1):
+                    for cz in range(center[2] - ring, center[2] + ring + 1):
+                        # only the shell of the ring, the inside was searched before
+                        if max(abs(cx - center[0]), abs(cy - center[1]), abs(cz - center[2])) != ring:
+                            continue
+
+                        cell = self.cells.get((cx, cy, cz))
+                        if cell is not None:
+                            visit(cell)
+
+            # anything outside this ring is at least `ring` cells away
+            if len(best) == k and -best[0][0] <= (ring * self.cell_size) ** 2:
+                break
+
+        return [(math.sqrt(-distance_squared), self.objects[i]) for distance_squared, i in sorted(best, reverse=True)]
@@ -0,0 +1,219 @@
+import functools
+import struct
+import zlib
+from array import array
+from typing import Iterable, Iterator
+
+from BufferReader import BufferReader, StringCache
+from compression import read_chunk_header
+from reader import ACTOR_TRANSFORM, BpBodyReader, BpHeaderReader, BpManifestReader
+from structure import BpHeader, BpObject
+
+_INT32 = struct.Struct("<i")
+
+READ_SIZE = 64 * 1024
+
+
+class BpStreamReader(BufferReader):
+    """BufferReader over a stream of byte pieces, e.g. a file or a decompressor.
+
+    Only a window of the stream is kept in memory. It grows when a read runs past its end, and the bytes before the
+    current offset are dropped when it does. Offsets are relative to the window, so the reader can't seek back to
+    data it already consumed: skip_backwards works within the last read, set_offset and lazy objects don't work.
+    """
+
+    def __init__(self, pieces: Iterable[bytes], tracer=None, string_cache: StringCache = None, struct_cache=None):
+        super().__init__(bytearray(), tracer=tracer, string_cache=string_cache, struct_cache=struct_cache)
+        self.pieces = iter(pieces)
+
+        # stream position of the start of the window
+        self.base = 0
+
+    @property
+    def position(self) -> int:
+        """Offset in the whole stream."""
+        return self.base + self.offset
+
+    def _pull(self) -> bool:
+        piece = next(self.pieces, None)
+        if piece is None:
+            return False
+
+        self.buffer += piece
+        return True
+
+    def _fill(self, size: int):
+        """Make sure the next `size` bytes are in the window."""
+        if self.offset + size <= len(self.buffer):
+            return
+
+        # drop what was consumed, the window only ever holds the unread part of the stream
+        del self.buffer[:self.offset]
+        self.base += self.offset
+        self.offset = 0
+
+        while len(self.buffer) < size:
+            if not self._pull():
+                raise Exception(f"Unexpected end of stream at offset {self.position}")
+
+    def at_end(self) -> bool:
+        while self.offset >= len(self.buffer):
+            if not self._pull():
+                return True
+
+        return False
+
+    def next_byte(self):
+        self._fill(1)
+        return super().next_byte()
+
+    def next_float(self):
+        self._fill(4)
+        return super().next_float()
+
+    def next_int32(self):
+        self._fill(4)
+        return super().next_int32()
+
+    def next_int64(self):
+        self._fill(8)
+        return super().next_int64()
+
+    def next_struct(self, layout) -> tuple:
+        self._fill(layout.size)
+        return super().next_struct(layout)
+
+    def next_string(self):
+        self._fill(4)
+        self._fill(4 + _INT32.unpack_from(self.buffer, self.offset)[0])
+        return super().next_string()
+
+    def next_guid(self):
+        self._fill(16)
+        return super().next_guid()
+
+    def next_bytes(self, length):
+        self._fill(length)
+        return super().next_bytes(length)
+
+    def skip_forward(self, offset):
+        self._fill(offset)
+        super().skip_forward(offset)
+
+
+class BpHeaderTable:
+    """Compact side table of the object headers of a body.
+
+    The headers are kept as their encoded bytes and decoded when they are accessed, which takes a fraction of the
+    memory of the decoded objects.
+    """
+
+    def __init__(self, raw: bytearray, offsets: array):
+        self.raw = raw
+        self.offsets = offsets
+
+    @classmethod
+    def read(cls, reader: BufferReader) -> "BpHeaderTable":
+        """Copy the header table, starting at its object count."""
+        raw = bytearray()
+        offsets = array("q")
+
+        def copy_string():
+            length = reader.next_int32()
+            raw.extend(_INT32.pack(length))
+            raw.extend(reader.next_bytes(length))
+
+        for i in range(reader.next_int32()):
+            offsets.append(len(raw))
+
+            type_flag = reader.next_int32()
+            raw.extend(_INT32.pack(type_flag))
+
+            copy_string()  # type_path
+            copy_string()  # root
+            copy_string()  # instance_name
+
+            if type_flag == 0:
+                copy_string()  # parent_actor_name
+            elif type_flag == 1:
+                raw.extend(reader.next_bytes(ACTOR_TRANSFORM.size))
+            else:
+                raise Exception(f"Unknown header type: {type_flag}")
+
+        return cls(raw, offsets)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, number: int) -> BpHeader:
+        reader = BufferReader(self.raw, zero_copy=True)
+        reader.set_offset(self.offsets[number])
+        return BpHeaderReader().read(reader)
+
+
+def iter_decompress(reader: BpStreamReader, read_size: int = READ_SIZE) -> Iterator[bytes]:
+    """Inflate a chunk chain piece by piece, starting at the reader's offset. Nothing is joined."""
+    while not reader.at_end():
+        chunk = read_chunk_header(reader)
+
+        decompressor = zlib.decompressobj()
+        remaining = chunk.compressed_size
+        size = 0
+
+        while remaining:
+            piece = reader.next_bytes(min(remaining, read_size))
+            remaining -= len(piece)
+
+            data = decompressor.decompress(piece)
+            size += len(data)
+
+            if data:
+                yield data
+
+        data = decompressor.flush()
+        size += len(data)
+
+        if data:
+            yield data
+
+        if size != chunk.decompressed_size:
+            raise Exception(f"Invalid decompressed chunk size: {size} != {chunk.decompressed_size}")
+
+
+def iter_body(reader: BufferReader, body_reader: BpBodyReader = None) -> Iterator[BpObject]:
+    """Decode the objects of a decompressed body one at a time, in entity order.
+
+    Only the header table is kept (see BpHeaderTable), each object is yielded as soon as its entity is decoded.
+    """
+    body_reader = body_reader or BpBodyReader()
+
+    if body_reader.lazy:
+        raise Exception("Lazy objects can't be streamed")
+
+    body_size = reader.next_int32()
+    unknown_field = reader.next_int32()
+
+    headers = BpHeaderTable.read(reader)
+
+    uk1 = reader.next_int32()
+
+    entity_count = reader.next_int32()
+
+    for i in range(entity_count):
+        yield body_reader.read_entity(reader, i, headers[i])
+
+
+def iter_objects(path: str, string_cache: StringCache = None, struct_cache=None) -> Iterator[BpObject]:
+    """Stream the objects of a .sbp file.
+
+    Memory is bounded by the encoded header table and the largest entity, the decoded objects are never all alive.
+
+    :param struct_cache: Optional reader.BpStructCache, shares identical struct properties between the objects.
+    """
+    with open(path, "rb") as f:
+        content_reader = BpStreamReader(iter(functools.partial(f.read, READ_SIZE), b""))
+        BpManifestReader().read(content_reader)
+
+        body_reader = BpStreamReader(iter_decompress(content_reader), string_cache=string_cache or StringCache(),
+                                     struct_cache=struct_cache)
+        yield from iter_body(body_reader)
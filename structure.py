@@ -1,9 +1,13 @@
+import copy
 import dataclasses
-import json
+from array import array
 from dataclasses import dataclass
+from typing import Callable
 
+from export import to_json
 
-@dataclass
+
+@dataclass(slots=True)
 class BpHeader:
     type_flag: int
     type_path: str
@@ -11,7 +15,7 @@ class BpHeader:
     instance_name: str
 
 
-@dataclass
+@dataclass(slots=True)
 class BpActorHeader(BpHeader):
     need_transform: bool
 
@@ -31,97 +35,289 @@ class BpActorHeader(BpHeader):
     placed_in_level: str
 
 
-@dataclass
+@dataclass(slots=True)
 class BpComponentHeader(BpHeader):
     parent_actor_name: str
 
 
-@dataclass
+@dataclass(slots=True)
 class BpObjectReference:
     level_name: str
     path_name: str
 
 
-@dataclass
-class TypedData:
-    data_type: str
-    data: dict
+class BpStructValue:
+    """Base of the compact value types of fixed-size typed structs."""
+    __slots__ = ()
+
+    def astuple(self) -> tuple:
+        return tuple(getattr(self, field) for field in self.__slots__)
+
+
+@dataclass(frozen=True, slots=True)
+class BpColor(BpStructValue):
+    r: int
+    g: int
+    b: int
+    a: int
+
+
+@dataclass(frozen=True, slots=True)
+class BpLinearColor(BpStructValue):
+    r: float
+    g: float
+    b: float
+    a: float
+
+
+@dataclass(frozen=True, slots=True)
+class BpVector(BpStructValue):
+    x: float
+    y: float
+    z: float
+
+
+@dataclass(frozen=True, slots=True)
+class BpRotator(BpStructValue):
+    x: float
+    y: float
+    z: float
+
+
+@dataclass(frozen=True, slots=True)
+class BpVector2D(BpStructValue):
+    x: float
+    y: float
+
+
+@dataclass(frozen=True, slots=True)
+class BpVector4(BpStructValue):
+    x: float
+    y: float
+    z: float
+    w: float
+
+
+@dataclass(frozen=True, slots=True)
+class BpQuat(BpStructValue):
+    x: float
+    y: float
+    z: float
+    w: float
+
 
+@dataclass(frozen=True, slots=True)
+class BpGuid(BpStructValue):
+    guid: bytes
 
-@dataclass
+
+@dataclass(slots=True)
 class BpProperty:
     name: str
     prop_type: str
 
 
-@dataclass
+@dataclass(slots=True)
 class BpBoolProperty(BpProperty):
     value: bool
 
 
-@dataclass
+@dataclass(slots=True)
 class BpByteProperty(BpProperty):
     type: str
     value: str or int
 
 
-@dataclass
+@dataclass(slots=True)
 class BpEnumProperty(BpProperty):
     enum_type: str
     value: str
 
 
-@dataclass
+@dataclass(slots=True)
 class BpFloatProperty(BpProperty):
     value: float
 
 
-@dataclass
+@dataclass(slots=True)
 class BpIntProperty(BpProperty):
     value: int
 
 
-@dataclass
+@dataclass(slots=True)
 class BpInt64Property(BpProperty):
     value: int
 
 
-@dataclass
+@dataclass(slots=True)
 class BpObjectProperty(BpProperty):
     level_name: str
     path_name: str
 
 
-@dataclass
+@dataclass(slots=True)
 class BpStructProperty(BpProperty):
     struct_type: str
     is_typed_data: bool
-    data: list[BpProperty or None] or TypedData
+    data: list[BpProperty or None] or BpStructValue
 
 
-@dataclass
+@dataclass(slots=True)
 class BpArrayElement:
     name: str
     prop_type: str
 
 
-@dataclass
+@dataclass(slots=True)
 class BpArrayProperty(BpProperty):
     array_type: str
 
 
-@dataclass
+@dataclass(slots=True)
 class BpStructArrayProperty(BpArrayProperty):
     guid: str
     data: list[BpStructProperty]
 
 
-@dataclass
+@dataclass(slots=True)
 class BpValueArrayProperty(BpArrayProperty):
     data: list[any]
 
 
-@dataclass
+def _read_only_error(self, *args, **kwargs):
+    raise TypeError(f"{type(self).__name__} is shared and read-only, replace it instead of changing it")
+
+
+class BpReadOnlyList(list):
+    """A list that can't be changed, see read_only."""
+    __slots__ = ()
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only_error
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only_error
+
+    # the default reduce rebuilds the list with append/extend, these go through read_only instead
+    def __reduce_ex__(self, protocol):
+        return read_only, (list(self),)
+
+    def __deepcopy__(self, memo):
+        return [copy.deepcopy(v, memo) for v in self]
+
+
+class BpReadOnlyArray(array):
+    """An array that can't be changed, see read_only."""
+    __slots__ = ()
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only_error
+    append = extend = insert = pop = remove = reverse = byteswap = _read_only_error
+    frombytes = fromfile = fromlist = fromunicode = _read_only_error
+
+    def __reduce_ex__(self, protocol):
+        return read_only, (array(self.typecode, self),)
+
+    def __deepcopy__(self, memo):
+        return array(self.typecode, self)
+
+
+class BpReadOnlyDict(dict):
+    """A dict that can't be changed, see read_only."""
+    __slots__ = ()
+
+    __setitem__ = __delitem__ = __ior__ = _read_only_error
+    clear = pop = popitem = setdefault = update = _read_only_error
+
+    def __reduce_ex__(self, protocol):
+        return read_only, (dict(self),)
+
+    def __deepcopy__(self, memo):
+        return {k: copy.deepcopy(v, memo) for k, v in self.items()}
+
+
+class BpReadOnly:
+    """Base of the read-only variants of the property types, see read_only.
+
+    They compare equal to the mutable type they were made from. Pickling keeps them read-only, while deepcopy,
+    dataclasses.replace and calling the class make instances of the mutable type, to be changed and put in place of
+    the shared one.
+    """
+    __slots__ = ()
+
+    mutable_type: type = None
+
+    def __new__(cls, *args, **kwargs):
+        # read_only builds the read-only instances without calling the class
+        return cls.mutable_type(*args, **kwargs)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is shared and read-only, replace it instead of changing it")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is shared and read-only, replace it instead of changing it")
+
+    def _values(self) -> list:
+        return [getattr(self, name) for name in _READ_ONLY_TYPES[self.mutable_type][1]]
+
+    def __eq__(self, other):
+        if getattr(type(other), "mutable_type", type(other)) is not self.mutable_type:
+            return NotImplemented
+
+        return all(getattr(self, name) == getattr(other, name) for name in _READ_ONLY_TYPES[self.mutable_type][1])
+
+    __hash__ = None
+
+    # the read-only classes are made at runtime and can't be pickled by name, rebuild them from the mutable type
+    def __reduce_ex__(self, protocol):
+        return read_only, (self.mutable_type(*self._values()),)
+
+    def __deepcopy__(self, memo):
+        return self.mutable_type(*[copy.deepcopy(v, memo) for v in self._values()])
+
+    def __replace__(self, **changes):
+        return dataclasses.replace(self, **changes)
+
+
+# mutable dataclass -> (its read-only variant, field names)
+_READ_ONLY_TYPES: dict[type, tuple[type, tuple[str, ...]]] = {}
+
+
+def read_only(value):
+    """Deep read-only copy of a decoded value, for instances that are shared between objects.
+
+    Dataclasses become read-only subclasses of their own type, lists, arrays and dicts become BpReadOnlyList,
+    BpReadOnlyArray and BpReadOnlyDict. Values that can't be changed already are returned as they are.
+    """
+    if value is None or isinstance(value, (str, int, float, bytes, tuple, BpStructValue, BpReadOnly,
+                                           BpReadOnlyList, BpReadOnlyArray, BpReadOnlyDict)):
+        return value
+
+    if isinstance(value, list):
+        return BpReadOnlyList([read_only(v) for v in value])
+
+    if isinstance(value, array):
+        return BpReadOnlyArray(value.typecode, value)
+
+    if isinstance(value, dict):
+        return BpReadOnlyDict({k: read_only(v) for k, v in value.items()})
+
+    if isinstance(value, memoryview):
+        return value.toreadonly()
+
+    cls = type(value)
+    entry = _READ_ONLY_TYPES.get(cls)
+
+    if entry is None:
+        read_only_cls = type(f"ReadOnly{cls.__name__}", (BpReadOnly, cls), {"__slots__": (), "mutable_type": cls})
+        entry = _READ_ONLY_TYPES[cls] = (read_only_cls, tuple(field.name for field in dataclasses.fields(cls)))
+
+    read_only_cls, names = entry
+    shared = object.__new__(read_only_cls)
+
+    for name in names:
+        object.__setattr__(shared, name, read_only(getattr(value, name)))
+
+    return shared
+
+
+@dataclass(slots=True)
 class BpObject:
     header: BpHeader
     parent_root: str
@@ -130,11 +326,74 @@ class BpObject:
     properties: list[BpProperty or None]
 
     def dump_to_json(self):
-        class EnhancedJSONEncoder(json.JSONEncoder):
-            def default(self, o):
-                if dataclasses.is_dataclass(o):
-                    return dataclasses.asdict(o)
-                return super().default(o)
+        return to_json(self, indent=4)
+
+
+class BpLazyObject(BpObject):
+    """A BpObject whose properties are decoded from the body the first time they are accessed."""
+    __slots__ = ("offset", "size", "_load_properties")
+
+    def __init__(self, header: BpHeader, parent_root: str, parent_object_name: str,
+                 references: list[BpObjectReference], load_properties: Callable[[], list[BpProperty or None]],
+                 offset: int, size: int):
+        """
+        :param load_properties: Decodes the properties of this object.
+        :param offset: Offset of the entity's data (after its size prefix) in the body.
+        :param size: Size of the entity's data.
+        """
+        self.header = header
+        self.parent_root = parent_root
+        self.parent_object_name = parent_object_name
+        self.references = references
+        self.offset = offset
+        self.size = size
+        self._load_properties = load_properties
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._load_properties is None
+
+    def __getattr__(self, name):
+        # only called while `properties` is not set yet
+        if name == "properties" and self._load_properties is not None:
+            self.properties = self._load_properties()
+            self._load_properties = None
+            return self.properties
+
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+
+@dataclass(slots=True)
+class BpChunkHeader:
+    compressed_size: int
+    decompressed_size: int
+    data_offset: int  # offset of the compressed data in the source buffer
+
+
+@dataclass(slots=True)
+class BpIndexEntry:
+    type_path: str
+    header_offset: int  # offset of the header (its type flag) in the body
+    offset: int  # offset of the entity's size prefix in the body
+    size: int
+
+
+@dataclass(slots=True)
+class BpItemAmount:
+    item: str
+    amount: int
+
+
+@dataclass(slots=True)
+class BpManifest:
+    """The uncompressed part of a blueprint, in front of the compressed body."""
+    metadata: tuple[int, int, int]
+    dimensions: tuple[int, int, int]  # in meters
+    materials: list[BpItemAmount]
+    building_types: list[str]
 
-        return json.dumps(self, cls=EnhancedJSONEncoder, indent=4)
 
+@dataclass(slots=True)
+class BpBlueprint:
+    manifest: BpManifest
+    objects: list[BpObject]
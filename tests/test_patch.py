@@ -0,0 +1,50 @@
+import struct
+
+from BufferReader import BufferReader
+from BufferWriter import BufferWriter
+from benchmarks.synthetic import make_blueprint
+from compression import compress_body
+from parser import encode_blueprint, parse_content, write_body
+from patch import BpBlueprintPatcher
+from reader import BpManifestReader
+from structure import BpObjectProperty
+
+
+def _encode(blueprint, unknown_field: int) -> bytes:
+    """Encode a blueprint with a given value in the body's unknown field instead of the header table length."""
+    body = bytearray(write_body(blueprint.objects))
+    struct.pack_into("<i", body, 4, unknown_field)
+
+    writer = BufferWriter()
+    BpManifestReader().write(blueprint.manifest, writer)
+    return b"".join([writer.getbuffer(), compress_body(body)])
+
+
+def _parse(content: bytes):
+    return parse_content(BufferReader(content))
+
+
+def test_patch_round_trip():
+    blueprint = _parse(encode_blueprint(make_blueprint(50)))
+
+    patcher = BpBlueprintPatcher(encode_blueprint(blueprint))
+    prop = BpObjectProperty("mCurrentRecipe", "ObjectProperty", "", "/Game/Recipes/A_Longer_Recipe.A_Longer_Recipe_C")
+    patcher.set_property(blueprint.objects[10], prop)
+
+    blueprint.objects[10].properties[3] = prop
+    assert _parse(patcher.encode()) == blueprint
+
+
+def test_patch_unknown_field_is_not_header_length():
+    blueprint = _parse(encode_blueprint(make_blueprint(50)))
+
+    # the edit changes the length, so the entity data length after the header table has to be fixed up
+    patcher = BpBlueprintPatcher(_encode(blueprint, 0))
+    prop = BpObjectProperty("mCurrentRecipe", "ObjectProperty", "", "/x")
+    patcher.set_property(blueprint.objects[10], prop)
+
+    blueprint.objects[10].properties[3] = prop
+    content = patcher.encode()
+
+    assert _parse(content) == blueprint
+    assert content == _encode(blueprint, 0)
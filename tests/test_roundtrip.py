@@ -0,0 +1,23 @@
+from BufferReader import BufferReader
+from benchmarks.synthetic import make_blueprint
+from compression import MAX_CHUNK_SIZE, read_chunk_headers
+from parser import encode_blueprint, parse_content, write_body
+from reader import BpManifestReader
+
+
+def test_encode_round_trip():
+    # synthetic values aren't exact float32, the first parse rounds them
+    blueprint = parse_content(BufferReader(encode_blueprint(make_blueprint(2000))))
+
+    content = encode_blueprint(blueprint)
+    assert len(write_body(blueprint.objects)) > 4 * MAX_CHUNK_SIZE
+
+    reader = BufferReader(content)
+    BpManifestReader().read(reader)
+    assert len(read_chunk_headers(reader)) > 4
+
+    for workers in (1, 4):
+        decoded = parse_content(BufferReader(content), decompress_workers=workers)
+
+        assert decoded == blueprint
+        assert encode_blueprint(decoded) == content
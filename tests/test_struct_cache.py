@@ -0,0 +1,48 @@
+import copy
+import dataclasses
+import pickle
+
+from BufferReader import BufferReader
+from benchmarks.synthetic import make_blueprint
+from parser import encode_blueprint, parse_content
+from reader import BpStructCache
+from structure import BpLinearColor, BpReadOnly
+
+
+def _parse_cached():
+    content = encode_blueprint(make_blueprint(20))
+    return parse_content(BufferReader(content)), parse_content(BufferReader(content), struct_cache=BpStructCache())
+
+
+def test_deepcopy_is_mutable():
+    plain, cached = _parse_cached()
+
+    obj = copy.deepcopy(cached.objects[0])
+    assert obj == plain.objects[0]
+    assert not isinstance(obj.properties[1], BpReadOnly)
+
+    obj.properties[1].data[0].path_name = "/x"
+    assert cached.objects[0].properties[1] == plain.objects[0].properties[1]
+
+
+def test_replace_is_mutable():
+    plain, cached = _parse_cached()
+    shared = cached.objects[0].properties[0]
+
+    color = BpLinearColor(1.0, 0.0, 0.0, 1.0)
+    prop = dataclasses.replace(shared, data=color)
+
+    assert not isinstance(prop, BpReadOnly)
+    assert prop.data == color and prop.struct_type == shared.struct_type
+    assert shared == plain.objects[0].properties[0]
+
+
+def test_pickle_keeps_sharing_read_only():
+    plain, cached = _parse_cached()
+
+    objects = pickle.loads(pickle.dumps(cached.objects))
+    assert objects == plain.objects
+
+    prop = objects[0].properties[1]
+    assert isinstance(prop, BpReadOnly)
+    assert isinstance(prop.data[1], BpReadOnly)
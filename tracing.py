@@ -0,0 +1,151 @@
+from dataclasses import dataclass
+
+from structure import BpHeader
+
+
+class Tracer:
+    """Receives parse events from the readers.
+
+    A tracer is attached to a BufferReader (`reader.tracer`). Without one, the readers skip all tracing. Offsets are
+    positions in the whole input (`reader.position`), also for readers over a stream.
+    Subclass and override the events of interest.
+    """
+
+    def property(self, offset: int, name: str, prop_type: str, size: int, elapsed: float, struct_type: str | None):
+        """A property was decoded.
+
+        :param offset: Offset of the property (its name) in the buffer.
+        :param size: Number of bytes consumed, including name and type.
+        :param elapsed: Seconds spent decoding it, including nested properties.
+        :param struct_type: The struct type of struct properties, None for other types.
+        """
+        pass
+
+    def entity(self, index: int, header: BpHeader, offset: int, size: int):
+        """The property block of an entity is about to be decoded.
+
+        :param offset: Offset of the entity's size prefix in the buffer.
+        :param size: The entity's size prefix.
+        """
+        pass
+
+    def properties_start(self, offset: int):
+        """The top-level property block of an entity starts at `offset`.
+
+        With lazy objects this happens when the properties are first accessed, not right after entity().
+        """
+        pass
+
+    def phase(self, name: str, elapsed: float):
+        """A parse phase finished: "decompress", "headers" (the header table) or "entities"."""
+        pass
+
+
+class PrintTracer(Tracer):
+    """Prints every event, for debugging bad files."""
+
+    def property(self, offset: int, name: str, prop_type: str, size: int, elapsed: float, struct_type: str | None):
+        print(f"Property {name} ({prop_type}) at offset 0x{offset:02X}, {size} bytes")
+
+    def entity(self, index: int, header: BpHeader, offset: int, size: int):
+        print(f"Reading object {index + 1} (type: {"Actor" if header.type_flag == 1 else "Component"}) "
+              f"at offset 0x{offset:02X}, size: {size}")
+
+    def phase(self, name: str, elapsed: float):
+        print(f"Phase {name}: {elapsed:.3f}s")
+
+
+@dataclass(slots=True)
+class BpTypeStats:
+    count: int = 0
+    size: int = 0  # bytes consumed, including nested properties
+    time: float = 0.0  # including nested properties
+    self_time: float = 0.0  # excluding nested properties
+
+
+class ProfilingTracer(Tracer):
+    """Counts instances, bytes and decode time per property type and per struct type.
+
+    Nested properties are counted on their own and in the totals of the structs around them, `self_time` excludes
+    them. Tracing adds overhead of its own, compare the numbers with each other, not with an untraced parse.
+    """
+
+    def __init__(self):
+        self.by_type: dict[str, BpTypeStats] = {}
+        self.by_struct_type: dict[str, BpTypeStats] = {}
+        self.phases: dict[str, float] = {}
+        self.entities = 0
+
+        # decoded (offset, elapsed) of properties whose parent wasn't decoded yet, properties arrive children first
+        self._pending: list[tuple[int, float]] = []
+
+    def property(self, offset: int, name: str, prop_type: str, size: int, elapsed: float, struct_type: str | None):
+        # the properties just before this one that lie inside it are its direct children
+        children_time = 0.0
+        while self._pending and self._pending[-1][0] > offset:
+            children_time += self._pending.pop()[1]
+
+        self._pending.append((offset, elapsed))
+
+        self_time = elapsed - children_time
+
+        self._add(self.by_type, prop_type, size, elapsed, self_time)
+
+        if struct_type is not None:
+            self._add(self.by_struct_type, struct_type, size, elapsed, self_time)
+
+    @staticmethod
+    def _add(table: dict[str, BpTypeStats], key: str, size: int, elapsed: float, self_time: float):
+        stats = table.get(key)
+        if stats is None:
+            stats = table[key] = BpTypeStats()
+
+        stats.count += 1
+        stats.size += size
+        stats.time += elapsed
+        stats.self_time += self_time
+
+    def entity(self, index: int, header: BpHeader, offset: int, size: int):
+        self.entities += 1
+
+    def properties_start(self, offset: int):
+        # properties of another entity are never children, lazy objects decode their blocks in any order
+        self._pending.clear()
+
+    def phase(self, name: str, elapsed: float):
+        self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def as_dict(self) -> dict:
+        """Machine-readable results."""
+        def table(stats: dict[str, BpTypeStats]) -> dict:
+            return {key: {"count": s.count, "bytes": s.size, "time": s.time, "self_time": s.self_time}
+                    for key, s in stats.items()}
+
+        return {
+            "entities": self.entities,
+            "phases": dict(self.phases),
+            "prop_types": table(self.by_type),
+            "struct_types": table(self.by_struct_type),
+        }
+
+    def report(self, sort: str = "self_time", limit: int | None = None) -> str:
+        """Human-readable results, the most expensive types first.
+
+        :param sort: Field of BpTypeStats to sort by.
+        """
+        lines = ["Phases"]
+        for name, elapsed in self.phases.items():
+            lines.append(f"\t{name:<12}{elapsed:>10.3f}s")
+
+        for title, stats in (("Property types", self.by_type), ("Struct types", self.by_struct_type)):
+            lines.append(f"\n{title} ({self.entities} entities)")
+            lines.append(f"\t{'type':<32}{'count':>10}{'bytes':>12}{'time s':>10}{'self s':>10}{'self %':>8}")
+
+            total = sum(s.self_time for s in stats.values()) or 1.0
+            ranked = sorted(stats.items(), key=lambda item: getattr(item[1], sort), reverse=True)
+
+            for key, s in ranked[:limit]:
+                lines.append(f"\t{key:<32}{s.count:>10}{s.size:>12}{s.time:>10.3f}{s.self_time:>10.3f}"
+                             f"{s.self_time / total:>8.1%}")
+
+        return "\n".join(lines)
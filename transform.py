@@ -0,0 +1,157 @@
+import math
+
+from BufferWriter import BufferWriter
+from reader import ACTOR_TRANSFORM, TRANSFORM_FIELDS, BpHeaderReader
+from structure import BpActorHeader, BpObject
+
+try:
+    import numpy as np
+except ImportError:  # optional, only the bulk transforms need it
+    np = None
+
+
+def _quaternion_multiply(a, b):
+    """Hamilton product of (..., 4) arrays of (x, y, z, w) quaternions."""
+    ax, ay, az, aw = np.moveaxis(a, -1, 0)
+    bx, by, bz, bw = np.moveaxis(b, -1, 0)
+
+    return np.stack([aw * bx + ax * bw + ay * bz - az * by,
+                     aw * by - ax * bz + ay * bw + az * bx,
+                     aw * bz + ax * by - ay * bx + az * bw,
+                     aw * bw - ax * bx - ay * by - az * bz], axis=-1)
+
+
+def _rotate_vectors(quaternion, vectors):
+    """Rotate an (N, 3) array of vectors by one (x, y, z, w) quaternion."""
+    axis = quaternion[:3]
+    t = 2.0 * np.cross(axis, vectors)
+    return vectors + quaternion[3] * t + np.cross(axis, t)
+
+
+def axis_angle(axis: tuple[float, float, float], degrees: float) -> tuple[float, float, float, float]:
+    """Quaternion (x, y, z, w) of a rotation around an axis, e.g. axis_angle((0, 0, 1), 90) for a quarter turn."""
+    length = math.sqrt(sum(v * v for v in axis))
+    half = math.radians(degrees) / 2
+    s = math.sin(half) / length
+
+    return axis[0] * s, axis[1] * s, axis[2] * s, math.cos(half)
+
+
+class BpTransforms:
+    """The transforms of all actors of a blueprint as numpy arrays, transformed in bulk.
+
+    positions is (N, 3), rotations (N, 4) quaternions as (x, y, z, w), scales (N, 3). Every operation is applied
+    to all actors at once. Nothing changes on the headers until apply(), or use write_header_table to serialize the
+    results without touching the headers at all.
+    """
+
+    def __init__(self, headers: list[BpActorHeader]):
+        if np is None:
+            raise Exception("Bulk transforms need numpy, install it with: pip install numpy")
+
+        self.headers = headers
+
+        values = np.array([[getattr(header, name) for name in TRANSFORM_FIELDS] for header in headers],
+                          dtype=np.float64).reshape(-1, len(TRANSFORM_FIELDS))
+
+        self.rotations = values[:, 0:4].copy()
+        self.positions = values[:, 4:7].copy()
+        self.scales = values[:, 7:10].copy()
+
+    @classmethod
+    def from_objects(cls, objects: list[BpObject]) -> "BpTransforms":
+        return cls([obj.header for obj in objects if isinstance(obj.header, BpActorHeader)])
+
+    def __len__(self):
+        return len(self.headers)
+
+    def translate(self, offset: tuple[float, float, float]) -> "BpTransforms":
+        self.positions += offset
+        return self
+
+    def rotate(self, quaternion: tuple[float, float, float, float],
+               pivot: tuple[float, float, float] = (0.0, 0.0, 0.0)) -> "BpTransforms":
+        """Rotate the whole blueprint around a pivot, see axis_angle."""
+        quaternion = np.asarray(quaternion, dtype=np.float64)
+        pivot = np.asarray(pivot, dtype=np.float64)
+
+        self.positions = _rotate_vectors(quaternion, self.positions - pivot) + pivot
+        self.rotations = _quaternion_multiply(quaternion, self.rotations)
+        return self
+
+    def scale(self, factors: tuple[float, float, float],
+              pivot: tuple[float, float, float] = (0.0, 0.0, 0.0)) -> "BpTransforms":
+        """Scale positions around a pivot and the actors themselves.
+
+        Non-uniform factors are only exact for actors that are not rotated off the axes.
+        """
+        factors = np.asarray(factors, dtype=np.float64)
+        pivot = np.asarray(pivot, dtype=np.float64)
+
+        self.positions = (self.positions - pivot) * factors + pivot
+        self.scales *= factors
+        return self
+
+    def mirror(self, axis: int, pivot: float = 0.0) -> "BpTransforms":
+        """Mirror the blueprint on the plane through `pivot` that is normal to an axis (0: x, 1: y, 2: z).
+
+        Each actor gets the reflected rotation and a negative scale on the same axis, so its geometry is mirrored too.
+        """
+        self.positions[:, axis] = 2.0 * pivot - self.positions[:, axis]
+
+        # reflecting a rotation negates the vector part on the other two axes
+        for other in range(3):
+            if other != axis:
+                self.rotations[:, other] *= -1.0
+
+        self.scales[:, axis] *= -1.0
+        return self
+
+    def apply(self):
+        """Write the transforms back into the headers."""
+        rows = np.concatenate([self.rotations, self.positions, self.scales], axis=1).tolist()
+
+        for header, row in zip(self.headers, rows):
+            (header.rot_x, header.rot_y, header.rot_z, header.rot_w,
+             header.pos_x, header.pos_y, header.pos_z,
+             header.scale_x, header.scale_y, header.scale_z) = row
+
+    def pack(self) -> bytes:
+        """The ACTOR_TRANSFORM blocks of all actors, encoded at once."""
+        records = np.empty(len(self.headers), dtype=np.dtype([("need_transform", "<i4"),
+                                                              ("transform", "<f4", (len(TRANSFORM_FIELDS),)),
+                                                              ("placed_in_level", "<i4")]))
+        records["need_transform"] = [1 if header.need_transform else 0 for header in self.headers]
+        records["transform"] = np.concatenate([self.rotations, self.positions, self.scales], axis=1)
+        records["placed_in_level"] = [1 if header.placed_in_level else 0 for header in self.headers]
+
+        return records.tobytes()
+
+    def write_header_table(self, objects: list[BpObject], writer: BufferWriter):
+        """Write the header table of the objects the transforms were taken from, with the transformed values.
+
+        Same output as BpBodyReader.write_headers after apply(), the headers stay unchanged.
+        """
+        packed = memoryview(self.pack())
+        header_reader = BpHeaderReader()
+        actor = 0
+
+        writer.next_int32(len(objects))
+
+        for obj in objects:
+            header = obj.header
+
+            if not isinstance(header, BpActorHeader):
+                header_reader.write(header, writer)
+                continue
+
+            if actor >= len(self.headers) or header is not self.headers[actor]:
+                raise Exception(f"Object {header.instance_name} is not part of these transforms")
+
+            writer.next_int32(header.type_flag)
+            writer.next_string(header.type_path)
+            writer.next_string(header.root)
+            writer.next_string(header.instance_name)
+            writer.next_bytes(packed[actor * ACTOR_TRANSFORM.size:(actor + 1) * ACTOR_TRANSFORM.size])
+
+            actor += 1